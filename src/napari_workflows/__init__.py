@@ -4,3 +4,19 @@ __version__ = "0.2.11"
 from ._workflow import Workflow
 from ._workflow import WorkflowManager
 from ._workflow import is_image
+from ._array_backend import ArrayBackendDispatcher, requires_array_backend, array_namespace
+from ._batch import BatchRunner, batchable
+from ._batch_script import generate_batch_script
+from ._memory import MemoryBudgetExecutor
+from ._common_subexpressions import DeduplicatingExecutor, find_common_subexpressions
+from ._parameter_sweep import parameter_sweep, parameter_combinations
+from ._regions import spatial_footprint
+from ._lazy import lazy_result
+from ._instrumentation import Instrumentation, JsonLinesExporter, PrometheusTextExporter
+from ._checkpoint import CheckpointExecutor
+from ._analysis import WorkflowAnalysis, measure_costs
+from ._zarr_sink import ZarrSink
+from ._result_cache import ResultCache
+from ._diff import diff_workflows, rerun_changed
+from ._tuning import run_batch, calibrate_executor, save_executor_config, load_executor_config
+from ._shared_store import SharedResultStore
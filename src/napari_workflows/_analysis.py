@@ -0,0 +1,250 @@
+import heapq
+import json
+import time
+from ._workflow import Workflow, is_image, _is_task, _topological_order, _wrap_tasks
+
+
+def measure_costs(workflow: Workflow, names=None):
+    """
+    Executes a workflow once and measures the duration and output size of every step.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    names: list of str, optional
+        tasks to compute; by default all leafs
+
+    Returns
+    -------
+    tuple(dict, dict)
+        task name -> seconds and task name -> number of bytes of the result
+    """
+    from dask.threaded import get as dask_get
+
+    costs = {}
+    output_sizes = {}
+
+    def measured(name, task):
+        function = task[0]
+
+        def run(*args):
+            start_time = time.perf_counter()
+            result = function(*args)
+            costs[name] = time.perf_counter() - start_time
+            output_sizes[name] = _nbytes(result)
+            return result
+        return run
+
+    if names is None:
+        names = workflow.leafs()
+    dask_get(_wrap_tasks(workflow._tasks, measured), list(names))
+    return costs, output_sizes
+
+
+class WorkflowAnalysis():
+    """
+    Static analysis of a workflow graph: the critical path, how many steps can run in
+    parallel, the estimated duration and peak memory for a given number of workers and
+    the achievable speedup.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    costs: dict, optional
+        task name -> duration of the step, e.g. in seconds as returned by `measure_costs`.
+        Steps without cost count as 1.
+    output_sizes: dict, optional
+        name -> number of bytes of the result, e.g. as returned by `measure_costs`. Sizes of
+        data stored in the workflow are known; steps without size are assumed to produce
+        a result as large as their largest input.
+    """
+
+    def __init__(self, workflow: Workflow, costs: dict = None, output_sizes: dict = None):
+        costs = {} if costs is None else costs
+        output_sizes = {} if output_sizes is None else output_sizes
+
+        tasks = workflow._tasks
+        _, self.steps = _topological_order(tasks)
+        self.leafs = [l for l in workflow.leafs() if l in self.steps]
+
+        # sources of every step that are steps themselves or data, e.g. input images
+        self.sources = {}
+        for step in self.steps:
+            self.sources[step] = [s for s in dict.fromkeys(workflow.sources_of(step))
+                                  if s != step and (s in tasks.keys() or s in output_sizes.keys())]
+
+        self.costs = {step: costs.get(step, 1) for step in self.steps}
+
+        self.output_sizes = {}
+        for name, value in tasks.items():
+            if not _is_task(value):
+                self.output_sizes[name] = output_sizes.get(name, _nbytes(value))
+        for name, size in output_sizes.items():
+            if name not in tasks.keys():
+                self.output_sizes[name] = size
+        for step in self.steps:
+            if step in output_sizes.keys():
+                self.output_sizes[step] = output_sizes[step]
+            else:
+                self.output_sizes[step] = max([self.output_sizes[s] for s in self.sources[step]] + [0])
+
+        self.total_cost = sum(self.costs.values())
+
+        # earliest possible finish of every step, given unlimited workers
+        finish = {}
+        predecessor = {}
+        for step in self.steps:
+            step_sources = [s for s in self.sources[step] if s in finish.keys()]
+            start = max([finish[s] for s in step_sources] + [0])
+            predecessor[step] = max(step_sources, key=lambda s: finish[s]) if len(step_sources) > 0 else None
+            finish[step] = start + self.costs[step]
+
+        self.critical_path = []
+        self.critical_path_cost = 0
+        if len(self.steps) > 0:
+            step = max(self.steps, key=lambda s: finish[s])
+            self.critical_path_cost = finish[step]
+            while step is not None:
+                self.critical_path.insert(0, step)
+                step = predecessor[step]
+
+        # steps at the same level don't depend on each other
+        level = {}
+        for step in self.steps:
+            level[step] = max([level[s] + 1 for s in self.sources[step] if s in level.keys()] + [0])
+        widths = {}
+        for step in self.steps:
+            widths[level[step]] = widths.get(level[step], 0) + 1
+        self.levels = [[s for s in self.steps if level[s] == l] for l in sorted(widths.keys())]
+        self.max_parallel_width = max(widths.values()) if len(widths) > 0 else 0
+
+        # remaining duration from the start of a step to the end of the workflow
+        self._remaining = {}
+        followers = {step: [] for step in self.steps}
+        for step in self.steps:
+            for source in self.sources[step]:
+                if source in followers.keys():
+                    followers[source].append(step)
+        for step in reversed(self.steps):
+            self._remaining[step] = self.costs[step] + max([self._remaining[f] for f in followers[step]] + [0])
+        self._followers = followers
+
+    def speedup_bound(self, num_workers: int):
+        """
+        Returns the maximum speedup compared to one worker that `num_workers` workers can
+        achieve. It is limited by the number of workers and by the critical path.
+        """
+        if self.total_cost == 0:
+            return 1
+        return self.total_cost / max(self.critical_path_cost, self.total_cost / num_workers)
+
+    def simulate(self, num_workers: int = 1):
+        """
+        Simulates executing the workflow with a given number of workers, starting ready
+        steps with the longest remaining path first. Results are released as soon as all
+        steps using them finished; results of leafs and data stored in the workflow are kept.
+
+        Returns
+        -------
+        dict
+            estimated "duration", "peak_memory" in bytes and "speedup" compared to one worker
+        """
+        data_bytes = sum([size for name, size in self.output_sizes.items() if name not in self.steps])
+        memory = data_bytes
+        peak_memory = memory
+
+        missing = {step: len([s for s in self.sources[step] if s in self._followers.keys()]) for step in self.steps}
+        pending_followers = {step: len(self._followers[step]) for step in self.steps}
+        index = {step: i for i, step in enumerate(self.steps)}
+        ready = [(-self._remaining[s], index[s], s) for s in self.steps if missing[s] == 0]
+        heapq.heapify(ready)
+        running = []
+        now = 0
+
+        while len(ready) > 0 or len(running) > 0:
+            while len(ready) > 0 and len(running) < num_workers:
+                _, i, step = heapq.heappop(ready)
+                heapq.heappush(running, (now + self.costs[step], i, step))
+                # the result is allocated while the step runs
+                memory = memory + self.output_sizes[step]
+                peak_memory = max(peak_memory, memory)
+
+            now, _, step = heapq.heappop(running)
+            for source in self.sources[step]:
+                if source in pending_followers.keys():
+                    pending_followers[source] = pending_followers[source] - 1
+                    if pending_followers[source] == 0 and source not in self.leafs:
+                        memory = memory - self.output_sizes[source]
+            for follower in self._followers[step]:
+                missing[follower] = missing[follower] - 1
+                if missing[follower] == 0:
+                    heapq.heappush(ready, (-self._remaining[follower], index[follower], follower))
+
+        return {"duration": now,
+                "peak_memory": peak_memory,
+                "speedup": self.total_cost / now if now > 0 else 1}
+
+    def report(self, num_workers=(1, 2, 4, 8)):
+        """
+        Returns the results of the analysis as dictionary, e.g. for saving it as JSON.
+
+        Parameters
+        ----------
+        num_workers: list of int, optional
+            numbers of workers to estimate duration, peak memory and speedup for
+        """
+        return {
+            "steps": len(self.steps),
+            "total_cost": self.total_cost,
+            "critical_path": self.critical_path,
+            "critical_path_cost": self.critical_path_cost,
+            "max_parallel_width": self.max_parallel_width,
+            "levels": self.levels,
+            "costs": self.costs,
+            "output_sizes": self.output_sizes,
+            "workers": [dict({"num_workers": n, "speedup_bound": self.speedup_bound(n)}, **self.simulate(n))
+                        for n in num_workers],
+        }
+
+    def to_markdown(self, num_workers=(1, 2, 4, 8)):
+        """
+        Returns the report as human readable markdown text.
+        """
+        report = self.report(num_workers)
+        lines = ["# Workflow analysis", "",
+                 "* Steps: " + str(report["steps"]),
+                 "* Total cost: " + _format_number(report["total_cost"]),
+                 "* Critical path: " + " -> ".join(report["critical_path"]) +
+                 " (cost " + _format_number(report["critical_path_cost"]) + ")",
+                 "* Maximum parallel width: " + str(report["max_parallel_width"]),
+                 "",
+                 "| Workers | Estimated duration | Speedup | Speedup bound | Peak memory (MB) |",
+                 "|---|---|---|---|---|"]
+        for row in report["workers"]:
+            lines.append("| " + " | ".join([str(row["num_workers"]),
+                                             _format_number(row["duration"]),
+                                             _format_number(row["speedup"]),
+                                             _format_number(row["speedup_bound"]),
+                                             _format_number(row["peak_memory"] / 1e6)]) + " |")
+        return "\n".join(lines) + "\n"
+
+    def save(self, filename: str, num_workers=(1, 2, 4, 8)):
+        """
+        Saves the report as JSON file or, if the filename ends with .md, as markdown file.
+        """
+        if filename.endswith(".md"):
+            text = self.to_markdown(num_workers)
+        else:
+            text = json.dumps(self.report(num_workers), indent=2)
+        with open(filename, "w") as stream:
+            stream.write(text)
+
+
+def _nbytes(value):
+    if is_image(value):
+        return int(getattr(value, "nbytes", 0))
+    return 0
+
+
+def _format_number(value):
+    return "{:.3g}".format(value)
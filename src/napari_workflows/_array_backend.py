@@ -0,0 +1,199 @@
+import threading
+import numpy as np
+from ._workflow import Workflow, is_image, _wrap_tasks
+
+NUMPY = "numpy"
+DASK = "dask"
+CUPY = "cupy"
+
+# name of the function attribute set by requires_array_backend()
+_REQUIRED_BACKEND_ATTRIBUTE = "__workflow_array_backend__"
+
+
+def array_namespace(data):
+    """
+    Returns the name of the array library an image belongs to, e.g. "numpy", "dask" or "cupy".
+
+    Parameters
+    ----------
+    data: any
+
+    Returns
+    -------
+    str or None
+        None if data is not an image
+    """
+    if not is_image(data):
+        return None
+    if isinstance(data, np.ndarray):
+        return NUMPY
+    return type(data).__module__.split(".")[0]
+
+
+def to_namespace(data, namespace: str):
+    """
+    Converts an image to an array of the given array library.
+
+    Parameters
+    ----------
+    data: ndarray
+    namespace: str
+        "numpy", "dask" or "cupy"
+
+    Returns
+    -------
+    ndarray
+    """
+    source = array_namespace(data)
+    if source == namespace:
+        return data
+    if source == DASK:
+        # materialize lazy arrays before handing them over to another library
+        data = data.compute()
+        source = array_namespace(data)
+        if source == namespace:
+            return data
+
+    if namespace == NUMPY:
+        if source == CUPY:
+            return data.get()
+        return np.asarray(data)
+    if namespace == DASK:
+        import dask.array as da
+        return da.from_array(data, chunks=data.shape)
+    if namespace == CUPY:
+        import cupy
+        return cupy.asarray(data)
+    raise ValueError("Unsupported array namespace: " + str(namespace))
+
+
+def requires_array_backend(namespace: str):
+    """
+    Decorator declaring that a function can only process images of a given array library,
+    e.g. because it calls compiled code that expects numpy arrays.
+
+    Parameters
+    ----------
+    namespace: str
+        "numpy", "dask" or "cupy"
+    """
+    def decorator(function):
+        setattr(function, _REQUIRED_BACKEND_ATTRIBUTE, namespace)
+        return function
+    return decorator
+
+
+class ArrayBackendDispatcher():
+    """
+    Executes a Workflow while keeping track of the array library (numpy, dask, cupy, ...) each
+    intermediate result lives in. Images are passed on as they are, so that consecutive steps
+    stay on the same backend. Conversions only happen for steps that require a specific array
+    library, either declared using `requires_array_backend` or in the `requirements` dictionary.
+    Every intermediate result is converted at most once per target library and run.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    requirements: dict, optional
+        task name -> array namespace the function of this task requires
+    """
+
+    def __init__(self, workflow: Workflow, requirements: dict = None):
+        self.workflow = workflow
+        self.requirements = {} if requirements is None else dict(requirements)
+
+        # statistics of the last run
+        self.namespaces = {}
+        self.conversions = 0
+        self.converted = []
+
+        self._converted_values = {}
+        # (source, namespace) -> lock, so that a value is converted once while other
+        # conversions run in parallel
+        self._conversion_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Execute a task and all tasks that are necessary to retrieve the result.
+        Afterwards, `namespaces` contains the array library of every computed
+        image and `conversions` the number of conversions that were necessary.
+        """
+        from dask.threaded import get as dask_get
+
+        self.namespaces = {}
+        self.conversions = 0
+        self.converted = []
+        self._converted_values = {}
+
+        tasks = self.workflow._tasks
+        for key, task in tasks.items():
+            namespace = array_namespace(task)
+            if namespace is not None:
+                self.namespaces[key] = namespace
+
+        try:
+            return dask_get(_wrap_tasks(tasks, self._dispatching), name)
+        finally:
+            # don't keep converted copies of images in memory
+            self._converted_values = {}
+            self._conversion_locks = {}
+
+    def required_namespace(self, name, function):
+        """
+        Returns the array library a given task requires or None if it accepts any.
+        """
+        if name in self.requirements.keys():
+            return self.requirements[name]
+        return getattr(function, _REQUIRED_BACKEND_ATTRIBUTE, None)
+
+    def _dispatching(self, name, task):
+        function = task[0]
+        sources = task[1:]
+        required = self.required_namespace(name, function)
+
+        def dispatch(*args):
+            args = list(args)
+            if required is not None:
+                for i, value in enumerate(args):
+                    if array_namespace(value) not in [None, required]:
+                        args[i] = self._convert(sources[i], value, required)
+
+            result = function(*args)
+
+            namespace = array_namespace(result)
+            if namespace is not None:
+                with self._lock:
+                    self.namespaces[name] = namespace
+            return result
+
+        return dispatch
+
+    def _convert(self, source, value, namespace):
+        # intermediate results are referenced by name; converted versions of them can be reused
+        cache_key = (source, namespace) if isinstance(source, str) else None
+
+        if cache_key is None:
+            converted = to_namespace(value, namespace)
+            self._count_conversion(None, value, namespace)
+            return converted
+
+        with self._lock:
+            key_lock = self._conversion_locks.setdefault(cache_key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if cache_key in self._converted_values.keys():
+                    return self._converted_values[cache_key]
+
+            # may take long, e.g. computing a dask array; other keys aren't blocked meanwhile
+            converted = to_namespace(value, namespace)
+
+            with self._lock:
+                self._converted_values[cache_key] = converted
+            self._count_conversion(source, value, namespace)
+            return converted
+
+    def _count_conversion(self, source, value, namespace):
+        with self._lock:
+            self.conversions = self.conversions + 1
+            self.converted.append((source, array_namespace(value), namespace))
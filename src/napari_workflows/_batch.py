@@ -0,0 +1,173 @@
+import threading
+import numpy as np
+from ._workflow import Workflow, is_image, _wrap_tasks
+
+# name of the function attribute set by batchable()
+_BATCHABLE_ATTRIBUTE = "__workflow_batchable__"
+
+
+def batchable(function):
+    """
+    Decorator declaring that a function can process a stack of images along a new leading
+    axis in one call, e.g. because it works pixel-wise or along the other axes only. The
+    result of such a function must also be a stack with one image per item.
+    """
+    setattr(function, _BATCHABLE_ATTRIBUTE, True)
+    return function
+
+
+class _Batch():
+    """
+    The results of one task for all items of a batch, either stacked along a new leading
+    axis or as a list. Conversion between both happens on demand only.
+    """
+
+    def __init__(self, stack=None, items=None):
+        self._stack = stack
+        self._items = items
+
+    def __len__(self):
+        if self._items is not None:
+            return len(self._items)
+        return self._stack.shape[0]
+
+    def can_stack(self):
+        if self._stack is not None:
+            return True
+        first = self._items[0]
+        return all([is_image(i) and i.shape == first.shape and i.dtype == first.dtype for i in self._items])
+
+    def stack(self):
+        if self._stack is None:
+            self._stack = np.stack(self._items)
+        return self._stack
+
+    def item(self, index):
+        if self._items is not None:
+            return self._items[index]
+        return self._stack[index]
+
+    def items(self):
+        return [self.item(i) for i in range(len(self))]
+
+
+class BatchRunner():
+    """
+    Executes a Workflow for many inputs at once. Inputs of the same shape are stacked along
+    a new leading axis. Steps that are declared batch-capable, using `batchable` or the
+    `batchable_tasks` parameter, are called once for the whole stack. All other steps are
+    called for every item individually.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    batchable_tasks: list of str, optional
+        names of tasks that can process stacks of images in addition to those whose
+        function is decorated with `batchable`
+    """
+
+    def __init__(self, workflow: Workflow, batchable_tasks=None):
+        self.workflow = workflow
+        self.batchable_tasks = [] if batchable_tasks is None else list(batchable_tasks)
+
+        # statistics of the last run
+        self.batched_calls = 0
+        self.single_calls = 0
+        self._lock = threading.Lock()
+
+    def is_batchable(self, name):
+        """
+        Returns if the task with the given name can process stacks of images.
+        """
+        if name in self.batchable_tasks:
+            return True
+        task = self.workflow.get_task(name)
+        return getattr(task[0], _BATCHABLE_ATTRIBUTE, False)
+
+    def get(self, name, inputs):
+        """
+        Execute a task and all tasks that are necessary to retrieve the result for every given input.
+
+        Parameters
+        ----------
+        name: str
+            name of the task to compute
+        inputs: list of dict or list of ndarray
+            For every item of the batch a dictionary mapping root names to images. If the
+            workflow has a single root, images can be passed directly.
+
+        Returns
+        -------
+        list
+            one result per input, in the order of the inputs
+        """
+        from dask.threaded import get as dask_get
+
+        inputs = [self._as_dict(i) for i in inputs]
+        self.batched_calls = 0
+        self.single_calls = 0
+
+        # group inputs so that each group can be stacked
+        groups = {}
+        for index, item in enumerate(inputs):
+            signature = tuple([(k, _shape_and_type(v)) for k, v in sorted(item.items())])
+            if signature not in groups.keys():
+                groups[signature] = []
+            groups[signature].append(index)
+
+        results = [None] * len(inputs)
+        for indices in groups.values():
+            tasks = _wrap_tasks(self.workflow._tasks, self._batching)
+            for key in inputs[indices[0]].keys():
+                tasks[key] = _Batch(items=[inputs[i][key] for i in indices])
+
+            result = dask_get(tasks, name)
+            for index, value in zip(indices, _unbatch(result, len(indices))):
+                results[index] = value
+        return results
+
+    def _as_dict(self, item):
+        if isinstance(item, dict):
+            return item
+        roots = self.workflow.roots()
+        if len(roots) != 1:
+            raise ValueError("Inputs must be dictionaries for workflows with " + str(len(roots)) + " roots: " + str(roots))
+        return {roots[0]: item}
+
+    def _batching(self, name, task):
+        function = task[0]
+        batch_capable = self.is_batchable(name)
+
+        def run(*args):
+            batches = [a for a in args if isinstance(a, _Batch)]
+            if len(batches) == 0:
+                # the result doesn't depend on the batch
+                return function(*args)
+            count = len(batches[0])
+
+            if batch_capable and all([b.can_stack() for b in batches]):
+                with self._lock:
+                    self.batched_calls = self.batched_calls + 1
+                result = function(*[a.stack() if isinstance(a, _Batch) else a for a in args])
+                if not is_image(result) or result.shape[0] != count:
+                    raise ValueError("Batch-capable step '" + name + "' did not return one result per item")
+                return _Batch(stack=result)
+
+            with self._lock:
+                self.single_calls = self.single_calls + count
+            return _Batch(items=[function(*[a.item(i) if isinstance(a, _Batch) else a for a in args])
+                                 for i in range(count)])
+
+        return run
+
+
+def _shape_and_type(data):
+    if is_image(data):
+        return (tuple(data.shape), str(data.dtype))
+    return None
+
+
+def _unbatch(result, count):
+    if isinstance(result, _Batch):
+        return result.items()
+    return [result] * count
@@ -0,0 +1,252 @@
+from ._workflow import Workflow, is_image, _topological_order, _module_metadata
+
+_SCRIPT_HEADER = '''\
+"""
+Batch processing script generated by napari-workflows.
+
+Process all images in a folder:
+    python {script} path/to/input_folder path/to/output_folder
+
+Process all time points of a timelapse dataset:
+    python {script} path/to/timelapse.tif path/to/output_folder --timelapse
+
+Results are written to one sub-folder per output. Inputs whose results exist
+already are skipped, so that an interrupted run can be continued.
+"""
+'''
+
+_SCRIPT_MAIN = '''
+def read_image(filename):
+    if filename.lower().endswith((".tif", ".tiff")):
+        return tifffile.imread(filename)
+    return imread(filename)
+
+
+def output_filenames(output_folder, name):
+    return {key: os.path.join(output_folder, folder, name + ".tif") for key, folder in OUTPUTS.items()}
+
+
+def is_done(output_folder, name):
+    return all([os.path.exists(f) for f in output_filenames(output_folder, name).values()])
+
+
+def save_results(results, output_folder, name):
+    for key, filename in output_filenames(output_folder, name).items():
+        # write to a temporary file first so that aborted runs don't leave incomplete results
+        temp_filename = filename[:-4] + ".incomplete.tif"
+        tifffile.imwrite(temp_filename, np.asarray(results[key]))
+        os.replace(temp_filename, filename)
+
+
+def process_file(filename, output_folder):
+    name = os.path.splitext(os.path.basename(filename))[0]
+    save_results(process(read_image(filename)), output_folder, name)
+    return name
+
+
+def process_timepoint(image, timepoint, output_folder):
+    name = "t" + str(timepoint).zfill(5)
+    save_results(process(image), output_folder, name)
+    return name
+
+
+def process_files(filenames, output_folder):
+    return [process_file(filename, output_folder) for filename in filenames]
+
+
+def process_timepoints(timepoints, output_folder):
+    return [process_timepoint(image, timepoint, output_folder) for image, timepoint in timepoints]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process images using a napari-workflow")
+    parser.add_argument("input", help="folder with images or, using --timelapse, a timelapse image file")
+    parser.add_argument("output", help="folder where results are stored")
+    parser.add_argument("--timelapse", action="store_true", help="process all time points of a single image file")
+    parser.add_argument("--workers", type=int, default=EXECUTOR["num_workers"], help="number of parallel workers")
+    parser.add_argument("--executor", choices=["threads", "processes"], default=EXECUTOR["executor"],
+                        help="whether workers are threads or processes")
+    parser.add_argument("--chunksize", type=int, default=EXECUTOR["chunksize"],
+                        help="number of inputs handed over to a worker at once")
+    args = parser.parse_args()
+
+    for folder in OUTPUTS.values():
+        os.makedirs(os.path.join(args.output, folder), exist_ok=True)
+
+    if args.timelapse:
+        timelapse = read_image(args.input)
+        todo = [(timelapse[timepoint], timepoint) for timepoint in range(timelapse.shape[0])
+                if not is_done(args.output, "t" + str(timepoint).zfill(5))]
+        function = process_timepoints
+    else:
+        todo = [os.path.join(args.input, filename) for filename in sorted(os.listdir(args.input))
+                if os.path.splitext(filename)[1].lower() in IMAGE_FILE_EXTENSIONS and
+                not is_done(args.output, os.path.splitext(filename)[0])]
+        function = process_files
+
+    print("Processing", len(todo), "inputs")
+    pool = ThreadPoolExecutor if args.executor == "threads" else ProcessPoolExecutor
+    with pool(max_workers=args.workers) as executor:
+        chunks = [todo[i:i + args.chunksize] for i in range(0, len(todo), args.chunksize)]
+        futures = [executor.submit(function, chunk, args.output) for chunk in chunks]
+        for future in as_completed(futures):
+            for name in future.result():
+                print("Done:", name)
+
+
+if __name__ == "__main__":
+    main()
+'''
+
+
+def generate_batch_script(workflow: Workflow, outputs=None, input_name: str = None, script_name: str = "batch_processing.py",
+                          executor_config: dict = None, image_names=None, workflow_filename: str = None):
+    """
+    Generates a standalone python script that processes all images in a folder or all time
+    points of a timelapse dataset in parallel using the given workflow. The script neither
+    depends on napari nor on napari-workflows.
+
+    Parameters
+    ----------
+    workflow: Workflow
+        The workflow which should be converted to code. All functions must be importable,
+        i.e. they must not be defined in __main__ or inside other functions.
+    outputs: list of str, optional
+        Names of the tasks whose results should be saved. By default, all leafs are saved.
+    input_name: str, optional
+        Name of the image that is read from disk. By default, the first root of the workflow.
+        The script reads a single image per input; tasks must not use other images.
+    script_name: str, optional
+        File name of the script as shown in its usage documentation
+    executor_config: dict, optional
+        Default executor, number of workers and chunk size of the script, e.g. as determined
+        using `calibrate_executor`. By default, the configuration saved next to the workflow
+        file (see `save_executor_config`) or all CPUs in threads.
+    image_names: list of str, optional
+        Names of the images the workflow is applied to, e.g. layers in the viewer, to tell
+        them apart from string parameters. Images stored in the workflow are known anyway.
+    workflow_filename: str, optional
+        Workflow file next to which the executor configuration was saved; by default the
+        file the workflow was loaded from or saved to
+
+    Returns
+    -------
+    str
+        python code
+
+    Raises
+    ------
+    ValueError
+        if a task uses an image other than the input, which the script cannot read
+    """
+    from ._tuning import DEFAULT_EXECUTOR_CONFIG, resolve_executor_config
+    executor = {k: v for k, v in resolve_executor_config(workflow, executor_config, workflow_filename).items()
+                if k in DEFAULT_EXECUTOR_CONFIG.keys()}
+
+    roots, order = _topological_order(workflow._tasks)
+    images = set(workflow._tasks.keys()) | set(image_names if image_names is not None else [])
+    if input_name is None:
+        # string parameters are roots as well
+        candidates = [r for r in roots if r in images] + roots
+        if len(candidates) == 0:
+            raise ValueError("The workflow has no input")
+        input_name = candidates[0]
+    if outputs is None:
+        outputs = [key for key in workflow.leafs() if key in order]
+
+    # only compute what is necessary for the outputs
+    necessary = set()
+    to_visit = list(outputs)
+    while len(to_visit) > 0:
+        key = to_visit.pop()
+        if key not in necessary and key in order:
+            necessary.add(key)
+            to_visit = to_visit + workflow.sources_of(key)
+    order = [key for key in order if key in necessary]
+
+    variable_names = {input_name: "image"}
+    for i, key in enumerate(order):
+        variable_names[key] = "result" + str(i) + "_" + _short_name(key)
+
+    def argument_code(key, value):
+        if isinstance(value, str) and value in variable_names.keys():
+            return variable_names[value]
+        if is_image(value) or (isinstance(value, str) and value in images):
+            name = repr(value) if isinstance(value, str) else "an image stored in the workflow"
+            raise ValueError("'" + key + "' uses " + name + ", which is not computed from the input '" +
+                             input_name + "'. Batch scripts process a single input image.")
+        return repr(value)
+
+    imports = [
+        "import argparse",
+        "import os",
+        "from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed",
+        "import numpy as np",
+        "from skimage.io import imread",
+        "import tifffile",
+    ]
+    function_names = {}
+    process_code = ["def process(image):"]
+    for key in order:
+        task = workflow.get_task(key)
+        function = task[0]
+        arguments = task[1:]
+
+        if function.__module__ == "__main__" or "<locals>" in function.__qualname__:
+            raise ValueError("Function " + function.__name__ + " used for '" + key + "' cannot be imported in a standalone script")
+
+        if function not in function_names.keys():
+            function_name = function.__name__
+            if function_name in function_names.values():
+                function_name = function_name + "_" + str(len(function_names))
+            function_names[function] = function_name
+
+            new_import = "from " + function.__module__ + " import " + function.__name__
+            if function_name != function.__name__:
+                new_import = new_import + " as " + function_name
+            _, version = _module_metadata(function.__module__.split(".")[0])
+            if version is not None:
+                new_import = new_import + "  # version " + str(version)
+            imports.append(new_import)
+
+        arg_str = ", ".join([argument_code(key, a) for a in arguments])
+        process_code.append("    # " + key)
+        process_code.append("    " + variable_names[key] + " = " + function_names[function] + "(" + arg_str + ")")
+
+    process_code.append("    return {")
+    for key in outputs:
+        process_code.append("        " + repr(key) + ": " + variable_names[key] + ",")
+    process_code.append("    }")
+
+    constants = [
+        "# task name -> output sub-folder",
+        "OUTPUTS = {",
+    ] + ["    " + repr(key) + ": " + repr(_folder_name(key)) + "," for key in outputs] + [
+        "}",
+        "",
+        "IMAGE_FILE_EXTENSIONS = ['.tif', '.tiff', '.png', '.jpg', '.jpeg', '.bmp']",
+        "",
+        "# default executor configuration",
+        "EXECUTOR = " + repr(executor),
+    ]
+
+    return _SCRIPT_HEADER.format(script=script_name) + \
+        "\n".join(imports) + "\n\n" + \
+        "\n".join(constants) + "\n\n\n" + \
+        "\n".join(process_code) + "\n\n" + \
+        _SCRIPT_MAIN
+
+
+def _short_name(key: str):
+    """
+    Turns a task name such as "Result of Gaussian blur" into a short variable name suffix like "gb".
+    """
+    temp = key.replace("Result of ", "").replace(" result", "")
+    return "".join([t[0] for t in temp.replace("_", " ").split(" ") if t != "" and t[0].isalnum()]).lower()
+
+
+def _folder_name(key: str):
+    """
+    Turns a task name into a name that can be used as folder name on all operating systems.
+    """
+    return "".join([c if c.isalnum() or c in "-_" else "_" for c in key])
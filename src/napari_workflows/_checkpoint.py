@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import pickle
+import threading
+from functools import partial
+import numpy as np
+from ._workflow import Workflow, is_image, _is_task, _wrap_tasks, _identity, _remove_file
+from ._fingerprint import task_fingerprints, content_hash
+
+MANIFEST_FILENAME = "manifest.json"
+
+
+class CheckpointExecutor():
+    """
+    Executes a Workflow while storing the result of every completed task in a directory,
+    together with a manifest listing the stored results. When running the same workflow
+    again, e.g. after a crash of a long-running job, results listed in the manifest are
+    loaded instead of being computed. Only tasks whose result is missing or stale, i.e.
+    their function, parameters or inputs changed, are recomputed. Functions count as
+    changed if their code or the version of their package changed.
+
+    Loaded results are verified using a content hash stored in the manifest; results that
+    don't match are recomputed.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    directory: str
+        where results and manifest are stored; created if necessary
+    verify: bool, optional
+        whether the content hash of loaded results is checked
+    """
+
+    def __init__(self, workflow: Workflow, directory: str, verify: bool = True):
+        self.workflow = workflow
+        self.directory = directory
+        self.verify = verify
+
+        # statistics of the last run
+        self.loaded = []
+        self.computed = []
+        self.invalid = []
+
+        self._lock = threading.Lock()
+
+    def manifest_filename(self):
+        return os.path.join(self.directory, MANIFEST_FILENAME)
+
+    def read_manifest(self):
+        """
+        Returns the manifest: task name -> dictionary with fingerprint, filename and
+        content hash of the stored result.
+        """
+        filename = self.manifest_filename()
+        if not os.path.exists(filename):
+            return {}
+        with open(filename) as stream:
+            return json.load(stream)["results"]
+
+    def get(self, name):
+        """
+        Execute a task and all tasks that are necessary to retrieve the result, resuming
+        from stored results where possible. Afterwards, `loaded` and `computed` tell which
+        results were loaded and which were computed. `invalid` lists stored results that
+        couldn't be used, because they were stale or corrupted.
+        """
+        from dask.threaded import get as dask_get
+
+        os.makedirs(self.directory, exist_ok=True)
+        self.loaded = []
+        self.computed = []
+        self.invalid = []
+
+        tasks = self.workflow._tasks
+        fingerprints = task_fingerprints(self.workflow)
+        manifest = self.read_manifest()
+
+        graph = _wrap_tasks(tasks, lambda key, task: self._checkpointed(key, task, fingerprints[key], manifest))
+
+        # walk from the requested task towards the roots and stop at usable stored results
+        visited = set()
+        to_visit = [name]
+        while len(to_visit) > 0:
+            key = to_visit.pop()
+            if key in visited or key not in tasks.keys() or not _is_task(tasks[key]):
+                continue
+            visited.add(key)
+            if key in manifest.keys():
+                data = None
+                if manifest[key]["fingerprint"] == fingerprints[key]:
+                    data = self._load(manifest[key])
+                if data is not None:
+                    graph[key] = (partial(_identity, data),)
+                    self.loaded.append(key)
+                    continue
+                self.invalid.append(key)
+            to_visit = to_visit + self.workflow.sources_of(key)
+
+        return dask_get(graph, name)
+
+    def _checkpointed(self, name, task, fingerprint, manifest):
+        function = task[0]
+
+        def run(*args):
+            result = function(*args)
+            self._store(name, fingerprint, result, manifest)
+            return result
+
+        return run
+
+    def _store(self, name, fingerprint, data, manifest):
+        if is_image(data):
+            data = np.asarray(data)
+            filename = fingerprint + ".npy"
+            _atomic_write(os.path.join(self.directory, filename), lambda stream: np.save(stream, data))
+            data_hash = content_hash(data)
+        else:
+            filename = fingerprint + ".pickle"
+            serialized = pickle.dumps(data)
+            _atomic_write(os.path.join(self.directory, filename), lambda stream: stream.write(serialized))
+            data_hash = hashlib.sha1(serialized).hexdigest()
+
+        with self._lock:
+            previous = manifest.get(name)
+            manifest[name] = {"fingerprint": fingerprint, "file": filename, "hash": data_hash}
+            # write the manifest after every task, so that a crash loses at most the running tasks
+            text = json.dumps({"version": 1, "results": manifest}, indent=1)
+            _atomic_write(self.manifest_filename(), lambda stream: stream.write(text.encode()))
+            self.computed.append(name)
+
+            if previous is not None and previous["file"] != filename and \
+                    previous["file"] not in [e["file"] for e in manifest.values()]:
+                _remove_file(os.path.join(self.directory, previous["file"]))
+
+    def _load(self, entry):
+        """
+        Returns a stored result or None if it is missing or corrupted.
+        """
+        filename = os.path.join(self.directory, entry["file"])
+        try:
+            if filename.endswith(".npy"):
+                data = np.load(filename)
+                data_hash = content_hash(data) if self.verify else entry["hash"]
+            else:
+                with open(filename, "rb") as stream:
+                    serialized = stream.read()
+                data_hash = hashlib.sha1(serialized).hexdigest() if self.verify else entry["hash"]
+                data = pickle.loads(serialized) if data_hash == entry["hash"] else None
+        except Exception:
+            return None
+        if data_hash != entry["hash"]:
+            return None
+        return data
+
+
+def _atomic_write(filename, write):
+    # readers and resumed runs never see partially written files
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "wb") as stream:
+        write(stream)
+    os.replace(temp_filename, filename)
@@ -0,0 +1,90 @@
+from ._workflow import Workflow, _topological_order, _is_task
+from ._fingerprint import task_fingerprints
+
+
+def find_common_subexpressions(workflow: Workflow):
+    """
+    Finds tasks that call the same function with the same parameters on the same sources,
+    e.g. the same Gaussian blur in two branches of a workflow, and would hence compute
+    the same result.
+
+    Parameters
+    ----------
+    workflow: Workflow
+
+    Returns
+    -------
+    dict
+        name of a duplicate task -> name of the task that computes the same result
+    """
+    tasks = workflow._tasks
+    roots, order = _topological_order(tasks)
+
+    # data stored in the workflow is identified by name; hashing images isn't necessary here
+    root_tokens = {name: "root:" + name for name in list(tasks.keys()) + roots if name not in order}
+    fingerprints = task_fingerprints(workflow, root_tokens=root_tokens)
+
+    canonical = {}
+    duplicates = {}
+    for name in order:
+        fingerprint = fingerprints[name]
+        if fingerprint in canonical.keys():
+            duplicates[name] = canonical[fingerprint]
+        else:
+            canonical[fingerprint] = name
+    return duplicates
+
+
+class DeduplicatingExecutor():
+    """
+    Executes a Workflow while computing tasks that would produce identical results only
+    once. See `find_common_subexpressions`.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    """
+
+    def __init__(self, workflow: Workflow):
+        self.workflow = workflow
+
+        # duplicate task name -> name of the task whose result was used instead, determined in the last run
+        self.deduplicated = {}
+
+    def get(self, name):
+        """
+        Execute a task and all tasks that are necessary to retrieve the result.
+        Afterwards, `deduplicated` tells which tasks were not computed because
+        an identical task was computed already.
+        """
+        from dask.threaded import get as dask_get
+
+        duplicates = find_common_subexpressions(self.workflow)
+
+        tasks = {}
+        for key, task in self.workflow._tasks.items():
+            if key in duplicates.keys():
+                # an alias: dask will hand over the result of the other task
+                tasks[key] = duplicates[key]
+            elif _is_task(task):
+                tasks[key] = tuple([task[0]] + [duplicates[a] if isinstance(a, str) and a in duplicates.keys() else a
+                                                for a in task[1:]])
+            else:
+                tasks[key] = task
+
+        self.deduplicated = {k: v for k, v in duplicates.items() if k in _dependencies(self.workflow, name)}
+        return dask_get(tasks, name)
+
+
+def _dependencies(workflow: Workflow, name):
+    """
+    Returns the names of a task and all tasks it depends on.
+    """
+    dependencies = set()
+    to_visit = [name]
+    while len(to_visit) > 0:
+        item = to_visit.pop()
+        if item not in dependencies:
+            dependencies.add(item)
+            to_visit = to_visit + workflow.sources_of(item)
+    return dependencies
@@ -0,0 +1,126 @@
+from functools import partial
+from ._workflow import Workflow, _is_task, _topological_order, _identity
+from ._fingerprint import task_fingerprints, _task_signature
+
+
+class WorkflowDiff():
+    """
+    Differences between two versions of a workflow, as determined by `diff_workflows`.
+
+    Attributes
+    ----------
+    added: list of str
+        tasks that exist in the new version only
+    removed: list of str
+        tasks that exist in the old version only
+    changed: list of str
+        tasks whose function, parameters or sources changed
+    affected: list of str
+        tasks of the new version whose results differ from the old version: added and
+        changed tasks and all tasks depending on them, in execution order
+    unchanged: list of str
+        tasks of the new version whose results are the same as in the old version
+    """
+
+    def __init__(self, added, removed, changed, affected, unchanged):
+        self.added = added
+        self.removed = removed
+        self.changed = changed
+        self.affected = affected
+        self.unchanged = unchanged
+
+    def __bool__(self):
+        return len(self.added) + len(self.removed) + len(self.affected) > 0
+
+    def __str__(self):
+        out = "WorkflowDiff:\n"
+        for title, names in [("added", self.added), ("removed", self.removed),
+                             ("changed", self.changed), ("affected", self.affected)]:
+            out = out + title + ": " + ", ".join(names) + "\n"
+        return out
+
+    def to_dict(self):
+        return {"added": self.added, "removed": self.removed, "changed": self.changed,
+                "affected": self.affected, "unchanged": self.unchanged}
+
+
+def diff_workflows(old: Workflow, new: Workflow):
+    """
+    Compares two versions of a workflow, e.g. loaded from an old and a new workflow file,
+    task by task.
+
+    Parameters
+    ----------
+    old: Workflow
+    new: Workflow
+
+    Returns
+    -------
+    WorkflowDiff
+    """
+    old_tasks = {k: v for k, v in old._tasks.items() if _is_task(v)}
+    new_tasks = {k: v for k, v in new._tasks.items() if _is_task(v)}
+    _, order = _topological_order(new._tasks)
+
+    added = [k for k in new_tasks.keys() if k not in old_tasks.keys()]
+    removed = [k for k in old_tasks.keys() if k not in new_tasks.keys()]
+    changed = [k for k in new_tasks.keys() if k in old_tasks.keys() and
+               _task_signature(old_tasks[k]) != _task_signature(new_tasks[k])]
+
+    # the fingerprint of a task changes if the task or any task upstream changed
+    old_fingerprints = task_fingerprints(old)
+    new_fingerprints = task_fingerprints(new)
+    affected = [k for k in order if old_fingerprints.get(k) != new_fingerprints[k]]
+    unchanged = [k for k in order if k not in affected]
+    return WorkflowDiff(added, removed, changed, affected, unchanged)
+
+
+def rerun_changed(old: Workflow, new: Workflow, results: dict, names=None):
+    """
+    Computes results of a new version of a workflow, given stored results of the old
+    version. Only tasks affected by the changes are computed; stored results of the other
+    tasks are reused.
+
+    Parameters
+    ----------
+    old: Workflow
+    new: Workflow
+    results: dict
+        task name -> result computed with the old version
+    names: list of str, optional
+        tasks whose results are returned; by default all affected tasks with stored
+        results and all added leafs, i.e. what needs to be stored again
+
+    Returns
+    -------
+    tuple(dict, list of str)
+        task name -> result of the new version, and the names of the computed tasks
+    """
+    from dask.threaded import get as dask_get
+
+    diff = diff_workflows(old, new)
+    if names is None:
+        leafs = new.leafs()
+        names = [k for k in diff.affected if k in results.keys() or k in leafs]
+
+    graph = dict(new._tasks)
+    for key in diff.unchanged:
+        if key in results.keys():
+            # dask won't compute the task nor its sources unless other tasks need them
+            graph[key] = (partial(_identity, results[key]),)
+
+    computed = []
+
+    def track(key, function):
+        def run(*args):
+            computed.append(key)
+            return function(*args)
+        return run
+
+    for key in diff.affected + [k for k in diff.unchanged if k not in results.keys()]:
+        task = graph[key]
+        graph[key] = tuple([track(key, task[0])] + list(task[1:]))
+
+    values = dask_get(graph, list(names))
+    return dict(zip(names, values)), computed
+
@@ -0,0 +1,268 @@
+import hashlib
+import types
+import uuid
+import weakref
+from ._workflow import Workflow, is_image, _topological_order
+
+
+# function -> token; entries are removed together with their functions
+_function_tokens = weakref.WeakKeyDictionary()
+
+
+def function_token(function, _seen=None):
+    """
+    Returns a string identifying a function by its module, name, package version and a
+    hash of its code. For functions that capture variables (closures), partials and bound
+    methods, the captured values and the bound object are included as well. Callable
+    objects are identified by their pickled state or, if they cannot be pickled, by a
+    token unique to the object.
+
+    Tokens are computed once per function object, so that captured images and bound
+    objects, e.g. large models, aren't hashed again on every call.
+
+    Parameters
+    ----------
+    function: callable
+
+    Returns
+    -------
+    str
+    """
+    try:
+        return _function_tokens[function]
+    except KeyError:
+        pass
+    except TypeError:
+        # not hashable or not weakly referencable
+        return _function_token(function, _seen)
+    token = _function_token(function, _seen)
+    if _seen is None:
+        # tokens computed within other tokens may be cut short at recursions
+        _function_tokens[function] = token
+    return token
+
+
+def _function_token(function, _seen):
+    # functions may capture themselves, e.g. recursive closures
+    _seen = set() if _seen is None else _seen
+    if id(function) in _seen:
+        return "recursion"
+    _seen = _seen | {id(function)}
+
+    if hasattr(function, "func") and hasattr(function, "args") and hasattr(function, "keywords"):
+        # functools.partial
+        return "partial(" + function_token(function.func, _seen) + "," + \
+            ",".join([value_token(a) for a in function.args]) + "," + \
+            ",".join([k + "=" + value_token(v) for k, v in sorted(function.keywords.items())]) + ")"
+
+    module = getattr(function, "__module__", None)
+    if module is None:
+        module = type(function).__module__
+    name = getattr(function, "__qualname__", None)
+    if name is None:
+        name = getattr(function, "__name__", None)
+    token = str(module) + "." + str(name) + _version_token(module)
+
+    bound_object = getattr(function, "__self__", None)
+    underlying = getattr(function, "__func__", None)
+    if underlying is not None and bound_object is not None:
+        # bound method: the same method of different objects computes different results
+        return "method(" + function_token(underlying, _seen) + "," + _object_token(bound_object) + ")"
+    if bound_object is not None and not isinstance(bound_object, types.ModuleType):
+        # method of a builtin type, e.g. a dictionary's get
+        token = token + "@" + _object_token(bound_object)
+
+    code = getattr(function, "__code__", None)
+    if code is not None:
+        token = token + "#" + _code_hash(code)
+        defaults = getattr(function, "__defaults__", None)
+        if defaults is not None:
+            token = token + "(" + ",".join([value_token(d) for d in defaults]) + ")"
+        closure = getattr(function, "__closure__", None)
+        if closure is not None:
+            token = token + "[" + ",".join([_cell_token(c, _seen) for c in closure]) + "]"
+    elif name is None or not isinstance(function, (types.BuiltinFunctionType, type)) and \
+            not type(function).__name__ == "ufunc":
+        # an instance of a callable class
+        token = type(function).__module__ + "." + type(function).__qualname__ + \
+            _version_token(type(function).__module__) + "@" + _object_token(function)
+    return token
+
+
+def _cell_token(cell, seen):
+    try:
+        contents = cell.cell_contents
+    except ValueError:
+        # empty cell
+        return "empty"
+    if callable(contents) and not is_image(contents):
+        return "function:" + function_token(contents, seen)
+    return value_token(contents)
+
+
+def _code_hash(code):
+    """
+    Returns a hash of byte code, constants and names of a code object, including nested
+    code objects, e.g. of inner functions and lambdas.
+    """
+    sha = hashlib.sha1()
+    sha.update(code.co_code)
+    sha.update(repr(code.co_names).encode())
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            sha.update(_code_hash(constant).encode())
+        else:
+            sha.update(repr(constant).encode())
+    return sha.hexdigest()
+
+
+def _version_token(module):
+    """
+    Returns the version of the package a module belongs to, so that results computed
+    with different versions of a package are not mixed up.
+    """
+    if not isinstance(module, str) or module == "":
+        return ""
+    try:
+        from ._workflow import _module_metadata
+        _, version = _module_metadata(module.split(".")[0])
+    except Exception:
+        return ""
+    return "" if version is None else "==" + str(version)
+
+
+# objects that cannot be pickled -> token unique to them
+_unique_object_tokens = weakref.WeakKeyDictionary()
+
+
+def _object_token(value):
+    """
+    Returns a string identifying an object by its type and pickled state. Objects that
+    cannot be pickled get a token unique to them, so that they are never mixed up.
+    """
+    import pickle
+    try:
+        return type(value).__qualname__ + ":" + hashlib.sha1(pickle.dumps(value)).hexdigest()
+    except Exception:
+        pass
+    try:
+        if value not in _unique_object_tokens:
+            _unique_object_tokens[value] = uuid.uuid4().hex
+        return type(value).__qualname__ + ":unique:" + _unique_object_tokens[value]
+    except TypeError:
+        # neither hashable nor weakly referencable: never equal to any other token
+        return type(value).__qualname__ + ":unique:" + uuid.uuid4().hex
+
+
+def value_token(value):
+    """
+    Returns a string representing a parameter value. Images are represented by a hash of
+    their content.
+
+    Parameters
+    ----------
+    value: any
+
+    Returns
+    -------
+    str
+    """
+    if is_image(value):
+        return "image:" + content_hash(value)
+    if callable(value):
+        return "function:" + function_token(value)
+    if isinstance(value, (tuple, list)):
+        return type(value).__name__ + "(" + ",".join([value_token(v) for v in value]) + ")"
+    return type(value).__name__ + ":" + repr(value)
+
+
+def content_hash(data):
+    """
+    Returns a hash of the shape, type and pixel values of an image.
+
+    Parameters
+    ----------
+    data: ndarray
+
+    Returns
+    -------
+    str
+    """
+    import numpy as np
+    if hasattr(data, "compute"):
+        data = data.compute()
+    if hasattr(data, "get") and not isinstance(data, np.ndarray):
+        # cupy
+        data = data.get()
+    data = np.ascontiguousarray(data)
+
+    sha = hashlib.sha1()
+    sha.update(str(data.shape).encode())
+    sha.update(str(data.dtype).encode())
+    sha.update(data.view(np.uint8).reshape(-1).data if data.size > 0 else b"")
+    return sha.hexdigest()
+
+
+def task_fingerprints(workflow: Workflow, root_tokens: dict = None, result_tokens: dict = None):
+    """
+    Computes a fingerprint for every task of a workflow. Two tasks have the same
+    fingerprint if they call the same function with the same parameters on inputs with
+    the same fingerprints, i.e. if they compute the same result.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    root_tokens: dict, optional
+        root name -> string identifying the data of the root, e.g. a content hash. By
+        default, roots are identified by their name and data stored in the workflow by
+        its content.
+    result_tokens: dict, optional
+        task name -> string identifying the result of the task, for results that were
+        modified after computing them, e.g. by painting. Replaces the fingerprint of the
+        task and changes the fingerprints of the tasks depending on it.
+
+    Returns
+    -------
+    dict
+        task name -> fingerprint
+    """
+    tasks = workflow._tasks
+    roots, order = _topological_order(tasks)
+
+    def root_token(name):
+        if root_tokens is not None and name in root_tokens.keys():
+            return root_tokens[name]
+        if name in tasks.keys():
+            return value_token(tasks[name])
+        return "root:" + name
+
+    fingerprints = {}
+    for name in list(tasks.keys()) + roots:
+        if name not in order and name not in fingerprints.keys():
+            fingerprints[name] = _hash(root_token(name))
+
+    for name in order:
+        task = tasks[name]
+        parts = [function_token(task[0])]
+        for argument in task[1:]:
+            if isinstance(argument, str) and argument in fingerprints.keys():
+                parts.append("source:" + fingerprints[argument])
+            else:
+                parts.append(value_token(argument))
+        fingerprints[name] = _hash("|".join(parts))
+        if result_tokens is not None and name in result_tokens.keys():
+            fingerprints[name] = _hash("result:" + result_tokens[name])
+    return fingerprints
+
+
+def _task_signature(task):
+    """
+    Returns a string identifying a task by its function, its parameters and the names
+    of its sources.
+    """
+    return function_token(task[0]) + "|" + "|".join([
+        "key:" + a if isinstance(a, str) else value_token(a) for a in task[1:]])
+
+
+def _hash(text: str):
+    return hashlib.sha1(text.encode()).hexdigest()
@@ -0,0 +1,224 @@
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# upper bounds of histogram buckets, suitable for durations in seconds
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 60)
+
+
+class Histogram():
+    """
+    Counts observed values in buckets and keeps track of their sum, minimum and maximum.
+
+    Parameters
+    ----------
+    buckets: tuple of float, optional
+        upper bounds of the buckets
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.bucket_counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+
+    def observe(self, value):
+        self.count = self.count + 1
+        self.sum = self.sum + value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.bucket_counts[i] = self.bucket_counts[i] + 1
+                break
+
+    def mean(self):
+        return self.sum / self.count if self.count > 0 else None
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "min": self.min, "max": self.max, "mean": self.mean(),
+                "buckets": dict(zip([str(b) for b in self.buckets], self.bucket_counts))}
+
+
+class Instrumentation():
+    """
+    Collects events, counters and histograms, e.g. of a WorkflowManager, and hands them
+    over to callbacks and exporters.
+
+    Callbacks are connected to event names (or "*" for all events) and receive the event
+    name and a dictionary of values. Exporters receive events via `export_event` and the
+    current counters and histograms via `export_metrics`, which is called at most every
+    `export_interval` seconds or when calling `export` explicitly.
+
+    Parameters
+    ----------
+    export_interval: float, optional
+        minimum number of seconds between two automatic metrics exports
+    """
+
+    def __init__(self, export_interval: float = 10):
+        self.export_interval = export_interval
+        self.counters = {}
+        self.histograms = {}
+        self._callbacks = {}
+        self._exporters = []
+        self._last_export = time.monotonic()
+        self._lock = threading.Lock()
+
+    def connect(self, event: str, callback):
+        """
+        Calls a function whenever a given event happens.
+
+        Parameters
+        ----------
+        event: str
+            event name or "*" for all events
+        callback: callable
+            receives the event name and a dictionary of values
+        """
+        with self._lock:
+            self._callbacks[event] = self._callbacks.get(event, []) + [callback]
+
+    def disconnect(self, event: str, callback):
+        with self._lock:
+            self._callbacks[event] = [c for c in self._callbacks.get(event, []) if c is not callback]
+
+    def add_exporter(self, exporter):
+        """
+        Adds an exporter, e.g. a `JsonLinesExporter` or a `PrometheusTextExporter`.
+        """
+        with self._lock:
+            self._exporters = self._exporters + [exporter]
+
+    def emit(self, event: str, **values):
+        """
+        Sends an event to the connected callbacks and exporters.
+        """
+        callbacks = self._callbacks.get(event, []) + self._callbacks.get("*", [])
+        for callback in callbacks:
+            callback(event, values)
+        exporters = self._exporters
+        for exporter in exporters:
+            exporter.export_event(event, values)
+        if len(exporters) > 0 and time.monotonic() - self._last_export > self.export_interval:
+            self.export()
+
+    def increment(self, counter: str, amount=1):
+        with self._lock:
+            self.counters[counter] = self.counters.get(counter, 0) + amount
+
+    def observe(self, histogram: str, value, buckets=DEFAULT_BUCKETS):
+        with self._lock:
+            if histogram not in self.histograms.keys():
+                self.histograms[histogram] = Histogram(buckets)
+            self.histograms[histogram].observe(value)
+
+    @contextmanager
+    def timer(self, histogram: str):
+        """
+        Measures the duration of a code block in seconds and adds it to a histogram.
+        """
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(histogram, time.perf_counter() - start_time)
+
+    def metrics(self):
+        """
+        Returns the current counters and histograms as dictionary.
+        """
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "histograms": {k: h.to_dict() for k, h in self.histograms.items()}}
+
+    def export(self):
+        """
+        Hands the current counters and histograms to all exporters.
+        """
+        self._last_export = time.monotonic()
+        for exporter in self._exporters:
+            exporter.export_metrics(self)
+
+
+class JsonLinesExporter():
+    """
+    Writes events and metrics as one JSON object per line to stdout or to a file.
+
+    Parameters
+    ----------
+    filename: str, optional
+        file the lines are appended to; by default stdout
+    """
+
+    def __init__(self, filename: str = None):
+        self.filename = filename
+        self._lock = threading.Lock()
+
+    def export_event(self, event, values):
+        self._write(dict({"time": time.time(), "event": event}, **values))
+
+    def export_metrics(self, instrumentation: Instrumentation):
+        self._write(dict({"time": time.time(), "event": "metrics"}, **instrumentation.metrics()))
+
+    def _write(self, record):
+        line = json.dumps(record, default=str) + "\n"
+        with self._lock:
+            if self.filename is None:
+                sys.stdout.write(line)
+            else:
+                with open(self.filename, "a") as stream:
+                    stream.write(line)
+
+
+class PrometheusTextExporter():
+    """
+    Writes counters and histograms in the Prometheus text format to a file, e.g. for the
+    textfile collector of the Prometheus node exporter. Events are not exported.
+
+    Parameters
+    ----------
+    filename: str
+    prefix: str, optional
+        prefix of all metric names
+    """
+
+    def __init__(self, filename: str, prefix: str = "napari_workflows_"):
+        self.filename = filename
+        self.prefix = prefix
+
+    def export_event(self, event, values):
+        pass
+
+    def export_metrics(self, instrumentation: Instrumentation):
+        lines = []
+        with instrumentation._lock:
+            for name, value in sorted(instrumentation.counters.items()):
+                metric = self.prefix + _metric_name(name)
+                lines.append("# TYPE " + metric + " counter")
+                lines.append(metric + " " + str(value))
+            for name, histogram in sorted(instrumentation.histograms.items()):
+                metric = self.prefix + _metric_name(name)
+                lines.append("# TYPE " + metric + " histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.bucket_counts):
+                    cumulative = cumulative + count
+                    lines.append(metric + '_bucket{le="' + str(bound) + '"} ' + str(cumulative))
+                lines.append(metric + '_bucket{le="+Inf"} ' + str(histogram.count))
+                lines.append(metric + "_sum " + str(histogram.sum))
+                lines.append(metric + "_count " + str(histogram.count))
+
+        # replace the file at once so that readers never see partial content
+        temp_filename = self.filename + ".tmp"
+        with open(temp_filename, "w") as stream:
+            stream.write("\n".join(lines) + "\n")
+        os.replace(temp_filename, self.filename)
+
+
+def _metric_name(name: str):
+    return "".join([c if c.isalnum() else "_" for c in name])
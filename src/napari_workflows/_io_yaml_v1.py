@@ -11,26 +11,121 @@ def save_workflow(filename:str, workflow:Workflow):
     """
     # Filter out workflow steps that do not represent a processing step
     workflow_to_save = Workflow()
-    for key, value in workflow._tasks.items():
-        if callable(value[0]): 
-            workflow_to_save.set(key, value)
+    workflow_to_save.set_many({key: value for key, value in workflow._tasks.items() if callable(value[0])})
     
     # Save the remaining steps to disk
     from yaml import dump
     with open(filename, 'w') as stream:
         dump(workflow_to_save,stream)
+    workflow.filename = filename
 
-def load_workflow(filename:str) -> Workflow:
+def load_workflow(filename:str, targets=None) -> Workflow:
     """Load a workflow from a file on disk.
 
     Parameters
     ----------
     filename: str
+    targets: str or list of str, optional
+        If given, only these tasks and the tasks they depend on are loaded.
+        See also `WorkflowFileIndex`.
 
     Returns
     -------
     Workflow
     """
+    if targets is not None:
+        return WorkflowFileIndex(filename).load(targets)
+
     from yaml import unsafe_load
     with open(filename, "rb") as stream:
-        return unsafe_load(stream)
\ No newline at end of file
+        workflow = unsafe_load(stream)
+    workflow.filename = filename
+    return workflow
+
+class WorkflowFileIndex():
+    """
+    Index of the tasks saved in a workflow file. Opening the index parses the file without
+    constructing tasks, so that listing the task names is fast and doesn't import any
+    module. Tasks are constructed when loading them, and only the modules their functions
+    live in are imported.
+
+    Parameters
+    ----------
+    filename: str
+    """
+
+    def __init__(self, filename: str):
+        import yaml
+        Loader = getattr(yaml, "CLoader", yaml.Loader)
+        with open(filename, "rb") as stream:
+            document = yaml.compose(stream, Loader=Loader)
+
+        self.filename = filename
+        self._nodes = {}
+        tasks_node = None
+        if isinstance(document, yaml.MappingNode):
+            for key_node, value_node in document.value:
+                if key_node.value == "_tasks":
+                    tasks_node = value_node
+        if not isinstance(tasks_node, yaml.MappingNode):
+            raise ValueError("File " + filename + " doesn't contain a workflow")
+        for key_node, value_node in tasks_node.value:
+            self._nodes[key_node.value] = value_node
+
+    def keys(self):
+        """
+        Returns the names of all tasks saved in the file.
+        """
+        return list(self._nodes.keys())
+
+    def sources_of(self, name):
+        """
+        Returns the names of the images a saved task processes, without loading it.
+        """
+        import yaml
+        node = self._nodes[name]
+        if not isinstance(node, yaml.SequenceNode):
+            return []
+        return [n.value for n in node.value
+                if isinstance(n, yaml.ScalarNode) and n.tag == "tag:yaml.org,2002:str"]
+
+    def required_keys(self, targets):
+        """
+        Returns the names of the given tasks and all saved tasks they depend on.
+        """
+        if isinstance(targets, str):
+            targets = [targets]
+        required = []
+        to_visit = list(targets)
+        while len(to_visit) > 0:
+            name = to_visit.pop()
+            if name in required:
+                continue
+            if name not in self._nodes.keys():
+                raise KeyError("Task '" + name + "' not found in " + self.filename)
+            required.append(name)
+            to_visit = to_visit + [s for s in self.sources_of(name) if s in self._nodes.keys()]
+        return [k for k in self._nodes.keys() if k in required]
+
+    def load(self, targets=None) -> Workflow:
+        """
+        Loads the given tasks and all tasks they depend on.
+
+        Parameters
+        ----------
+        targets: str or list of str, optional
+            by default all tasks
+
+        Returns
+        -------
+        Workflow
+        """
+        from yaml import UnsafeLoader
+        keys = self.keys() if targets is None else self.required_keys(targets)
+
+        # one constructor, so that functions referenced by several tasks are imported once
+        constructor = UnsafeLoader("")
+        workflow = Workflow()
+        workflow.set_many({key: constructor.construct_object(self._nodes[key], deep=True) for key in keys})
+        workflow.filename = self.filename
+        return workflow
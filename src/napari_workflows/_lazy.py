@@ -0,0 +1,117 @@
+from ._workflow import Workflow, is_image, _is_task
+from ._regions import get_footprint
+
+
+def plane_chunks(shape):
+    """
+    Returns chunks that contain single 2D planes, e.g. for a 3D image of shape (z, y, x)
+    chunks of shape (1, y, x).
+    """
+    return tuple([1] * (len(shape) - 2) + list(shape[-2:]))
+
+
+def lazy_result(workflow: Workflow, name, inputs: dict = None, hints: dict = None, chunks=None):
+    """
+    Returns the result of a task as lazily evaluated dask array. When accessing a part of
+    it, e.g. a single plane shown in the viewer, only the parts of the intermediate results
+    are computed that are necessary for this plane, given that the functions declared their
+    spatial footprint (see `spatial_footprint`). Functions without footprint are executed on
+    the whole image once any part of their result is accessed.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    name: str
+        name of the task to compute
+    inputs: dict, optional
+        name -> image data. Used for roots and to replace results of tasks which are known
+        already, e.g. layers in the viewer that are up-to-date.
+    hints: dict, optional
+        name -> array with the shape and type of the expected result, e.g. the previous data
+        of a layer. Functions without footprint need this hint if their result has a different
+        shape or type than their first image argument.
+    chunks: tuple of int, optional
+        Chunk shape of the lazy arrays. By default, single 2D planes.
+
+    Returns
+    -------
+    dask.array.Array
+    """
+    inputs = {} if inputs is None else inputs
+    hints = {} if hints is None else hints
+    tasks = workflow._tasks
+
+    results = {}
+
+    def lazy(key):
+        if key in results.keys():
+            return results[key]
+
+        if key in inputs.keys():
+            value = inputs[key]
+        elif key in tasks.keys() and not _is_task(tasks[key]):
+            value = tasks[key]
+        elif key in tasks.keys():
+            task = tasks[key]
+            arguments = [lazy(a) if isinstance(a, str) and (a in tasks.keys() or a in inputs.keys()) else a for a in task[1:]]
+            value = _lazy_call(task[0], arguments, hints.get(key), chunks)
+        else:
+            # a string parameter, e.g. mode="nearest"
+            value = key
+
+        if is_image(value):
+            value = _as_dask(value, chunks)
+        results[key] = value
+        return value
+
+    return lazy(name)
+
+
+def _as_dask(data, chunks=None):
+    import dask.array as da
+    if chunks is None:
+        chunks = plane_chunks(data.shape)
+    if isinstance(data, da.Array):
+        return data.rechunk(chunks)
+    return da.from_array(data, chunks=chunks)
+
+
+def _lazy_call(function, arguments, hint, chunks):
+    """
+    Applies a function to lazy arrays block-wise if it declared a footprint, or to the
+    whole images otherwise.
+    """
+    import dask.array as da
+    from dask import delayed
+
+    images = [i for i, a in enumerate(arguments) if isinstance(a, da.Array)]
+    if len(images) == 0:
+        return function(*arguments)
+    first = arguments[images[0]]
+
+    def call(*blocks):
+        values = list(arguments)
+        for i, block in zip(images, blocks):
+            values[i] = block
+        return function(*values)
+
+    same_shape = all([arguments[i].shape == first.shape for i in images])
+    radius = get_footprint(function, arguments, len(first.shape))
+    if radius is not None and same_shape and (hint is None or hint.shape == first.shape):
+        dtype = hint.dtype if hint is not None else None
+        blocks = [arguments[i].rechunk(first.chunks) for i in images]
+        return da.map_overlap(call, *blocks, depth=dict(enumerate(radius)), boundary="none",
+                              trim=True, dtype=dtype, meta=_meta(dtype, first))
+
+    # no footprint: compute the whole image at once
+    shape = hint.shape if hint is not None else first.shape
+    dtype = hint.dtype if hint is not None else first.dtype
+    result = da.from_delayed(delayed(call)(*[arguments[i] for i in images]), shape=shape, dtype=dtype)
+    return _as_dask(result, chunks)
+
+
+def _meta(dtype, like):
+    import numpy as np
+    if dtype is None:
+        return None
+    return np.empty((0,) * len(like.shape), dtype=dtype)
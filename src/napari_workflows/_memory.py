@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import threading
+import weakref
+import numpy as np
+from ._workflow import Workflow, _wrap_tasks, _remove_file
+
+
+class _Intermediate():
+    """
+    An intermediate result which is either kept in memory or stored in a temporary file.
+    """
+
+    def __init__(self, name, data, last_access):
+        self.name = name
+        self.nbytes = data.nbytes
+        self.last_access = last_access
+        self._data = data
+        self._filename = None
+        # held while loading and spilling, so that loading never sees a half-spilled result
+        self._lock = threading.Lock()
+
+    def in_memory(self):
+        return self._data is not None
+
+    def spill(self, directory):
+        """
+        Writes the result to a temporary file and releases it from memory. Returns False
+        if the result is being loaded right now and wasn't spilled.
+        """
+        if not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._data is None:
+                return False
+            fd, self._filename = tempfile.mkstemp(suffix=".npy", dir=directory)
+            os.close(fd)
+            np.save(self._filename, self._data)
+            self._data = None
+            # delete the file as soon as the result isn't needed anymore
+            weakref.finalize(self, _remove_file, self._filename)
+            return True
+        finally:
+            self._lock.release()
+
+    def load(self):
+        with self._lock:
+            data = self._data
+            if data is not None:
+                return data
+            # copy-on-write, so that functions modifying their input don't modify the file
+            return np.load(self._filename, mmap_mode="c")
+
+
+def _estimate_nbytes(data):
+    """
+    Returns the number of bytes an in-memory numpy array occupies, or 0 for other results
+    such as memory-mapped or lazy arrays and numbers.
+    """
+    if isinstance(data, np.ndarray) and not isinstance(data, np.memmap):
+        return data.nbytes
+    return 0
+
+
+class MemoryBudgetExecutor():
+    """
+    Executes a Workflow while keeping the intermediate results in memory below a given
+    budget. If storing another result would exceed the budget, the least recently used
+    intermediate results are written to memory-mapped temporary files and read from
+    there on demand. Results that are not needed anymore are released as usual and
+    don't count towards the budget.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    memory_budget: int
+        maximum number of bytes intermediate results may occupy in memory
+    temp_directory: str, optional
+        where the temporary files are stored; by default the system temp directory
+    """
+
+    def __init__(self, workflow: Workflow, memory_budget: int, temp_directory: str = None):
+        self.workflow = workflow
+        self.memory_budget = memory_budget
+        self.temp_directory = temp_directory
+
+        # statistics of the last run
+        self.spilled_bytes = 0
+        self.spilled = []
+        self.peak_bytes = 0
+
+        self._intermediates = weakref.WeakSet()
+        self._access_count = 0
+        self._run_directory = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """
+        Execute a task and all tasks that are necessary to retrieve the result.
+        Afterwards, `spilled_bytes` tells how many bytes were written to disk.
+        """
+        from dask.threaded import get as dask_get
+
+        self.spilled_bytes = 0
+        self.spilled = []
+        self.peak_bytes = 0
+        self._intermediates = weakref.WeakSet()
+        self._run_directory = tempfile.mkdtemp(prefix="napari-workflows-", dir=self.temp_directory)
+
+        try:
+            result = dask_get(_wrap_tasks(self.workflow._tasks, self._budgeted), name)
+            if isinstance(result, _Intermediate):
+                result = result.load()
+            if isinstance(result, np.memmap):
+                # the temporary file will be deleted
+                result = np.array(result)
+            return result
+        finally:
+            self._intermediates = weakref.WeakSet()
+            shutil.rmtree(self._run_directory, ignore_errors=True)
+            self._run_directory = None
+
+    def _budgeted(self, name, task):
+        function = task[0]
+
+        def run(*args):
+            args = [self._access(a) if isinstance(a, _Intermediate) else a for a in args]
+            result = function(*args)
+            del args
+
+            nbytes = _estimate_nbytes(result)
+            if nbytes == 0:
+                return result
+            return self._store(name, result, nbytes)
+
+        return run
+
+    def _access(self, intermediate):
+        with self._lock:
+            self._access_count = self._access_count + 1
+            intermediate.last_access = self._access_count
+        return intermediate.load()
+
+    def _store(self, name, data, nbytes):
+        with self._lock:
+            # only results that are still referenced by the scheduler are alive
+            candidates = sorted([i for i in self._intermediates if i.in_memory()], key=lambda i: i.last_access)
+            bytes_in_memory = sum([i.nbytes for i in candidates])
+
+            # spill cold results until the new one fits
+            while bytes_in_memory + nbytes > self.memory_budget and len(candidates) > 0:
+                coldest = candidates.pop(0)
+                if not coldest.spill(self._run_directory):
+                    # being loaded by another step
+                    continue
+                bytes_in_memory = bytes_in_memory - coldest.nbytes
+                self.spilled_bytes = self.spilled_bytes + coldest.nbytes
+                self.spilled.append(coldest.name)
+
+            self._access_count = self._access_count + 1
+            intermediate = _Intermediate(name, data, self._access_count)
+            self._intermediates.add(intermediate)
+            self.peak_bytes = max(self.peak_bytes, bytes_in_memory + nbytes)
+        return intermediate
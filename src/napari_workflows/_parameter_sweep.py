@@ -0,0 +1,152 @@
+import inspect
+import itertools
+from ._workflow import Workflow, _topological_order
+from ._fingerprint import _task_signature
+
+
+def parameter_combinations(grid: dict):
+    """
+    Turns a parameter grid into a list of all combinations.
+
+    Parameters
+    ----------
+    grid: dict
+        task name -> dict of parameter name -> list of values
+
+    Returns
+    -------
+    list of dict
+        each entry: task name -> dict of parameter name -> value
+    """
+    names = [(task, parameter) for task, parameters in grid.items() for parameter in parameters.keys()]
+    values = [grid[task][parameter] for task, parameter in names]
+
+    combinations = []
+    for combination in itertools.product(*values):
+        overrides = {}
+        for (task, parameter), value in zip(names, combination):
+            if task not in overrides.keys():
+                overrides[task] = {}
+            overrides[task][parameter] = value
+        combinations.append(overrides)
+    return combinations
+
+
+def parameter_sweep(workflow: Workflow, targets, overrides, metrics: dict = None, num_workers: int = None):
+    """
+    Computes the results of a workflow for many parameter combinations. All combinations
+    are combined in one task graph where tasks that don't change between combinations,
+    e.g. the steps upstream of the modified ones, are computed only once. The graph is
+    executed in parallel.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    targets: str or list of str
+        names of the tasks whose results are collected
+    overrides: dict or list of dict
+        Either a grid: task name -> dict of parameter name -> list of values, or an explicit
+        list of combinations: each a dict task name -> dict of parameter name -> value.
+    metrics: dict, optional
+        metric name -> function that receives a result and returns a measurement. If given,
+        the table contains the measurements for every target instead of the results.
+    num_workers: int, optional
+        number of threads used for computing
+
+    Returns
+    -------
+    list of dict
+        One row per parameter combination with columns "task.parameter" for the parameters and
+        the target names (or "target.metric" names) for results. It can be turned into a table
+        using e.g. `pandas.DataFrame(rows)`.
+    """
+    from dask.threaded import get as dask_get
+
+    if isinstance(targets, str):
+        targets = [targets]
+    if isinstance(overrides, dict):
+        overrides = parameter_combinations(overrides)
+
+    graph, result_keys = _sweep_graph(workflow, targets, overrides)
+
+    # combinations may share results, e.g. if a parameter doesn't influence a target
+    keys = list(dict.fromkeys([result_keys[i][t] for i in range(len(overrides)) for t in targets]))
+    results = dict(zip(keys, dask_get(graph, keys, num_workers=num_workers)))
+
+    rows = []
+    for i, combination in enumerate(overrides):
+        row = {}
+        for task, parameters in combination.items():
+            for parameter, value in parameters.items():
+                row[task + "." + parameter] = value
+        for target in targets:
+            result = results[result_keys[i][target]]
+            if metrics is None:
+                row[target] = result
+            else:
+                for metric, measure in metrics.items():
+                    row[target + "." + metric] = measure(result)
+        rows.append(row)
+    return rows
+
+
+def _sweep_graph(workflow: Workflow, targets, overrides):
+    """
+    Builds a task graph that computes the targets for all parameter combinations.
+    Tasks are shared among combinations if function, parameters and sources are identical.
+
+    Returns
+    -------
+    tuple(dict, list of dict)
+        the graph and, for every combination, a dictionary target name -> key in the graph
+    """
+    tasks = workflow._tasks
+    _, order = _topological_order(tasks)
+
+    graph = dict(tasks)
+    # task signature -> key in graph; unmodified tasks keep their name
+    known_tasks = {}
+    for name in order:
+        known_tasks[_task_signature(tasks[name])] = name
+
+    result_keys = []
+    for index, combination in enumerate(overrides):
+        for task_name in combination.keys():
+            if task_name not in order:
+                raise KeyError("Task '" + task_name + "' not found in workflow or it is not a processing step")
+
+        renamed = {}
+        for name in order:
+            task = tasks[name]
+            new_task = tuple([task[0]] + [renamed[a] if isinstance(a, str) and a in renamed.keys() else a for a in task[1:]])
+            if name in combination.keys():
+                new_task = _override_parameters(new_task, combination[name])
+
+            signature = _task_signature(new_task)
+            if signature not in known_tasks.keys():
+                key = name + " [sweep " + str(index) + "]"
+                graph[key] = new_task
+                known_tasks[signature] = key
+            if known_tasks[signature] != name:
+                renamed[name] = known_tasks[signature]
+
+        result_keys.append({t: renamed.get(t, t) for t in targets})
+    return graph, result_keys
+
+
+def _override_parameters(task, parameters: dict):
+    """
+    Returns a copy of a task tuple with parameters replaced by name.
+    """
+    function = task[0]
+    names = list(inspect.signature(function).parameters.keys())
+    arguments = list(task[1:])
+    for parameter, value in parameters.items():
+        if parameter not in names:
+            raise KeyError("Function " + function.__name__ + " has no parameter '" + parameter + "'")
+        position = names.index(parameter)
+        # parameters that are None at the end of tasks are not stored
+        while len(arguments) <= position:
+            arguments.append(None)
+        arguments[position] = value
+    return tuple([function] + arguments)
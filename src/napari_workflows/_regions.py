@@ -0,0 +1,176 @@
+import numpy as np
+from ._workflow import is_image
+
+# name of the function attribute set by spatial_footprint()
+_FOOTPRINT_ATTRIBUTE = "__workflow_footprint__"
+
+
+def spatial_footprint(radius):
+    """
+    Decorator declaring that every pixel of the result of a function only depends on input
+    pixels within a given radius, e.g. the radius of a filter kernel. Changes of the input
+    in a region then only require recomputing that region, dilated by the radius.
+
+    Parameters
+    ----------
+    radius: int, tuple of int or callable
+        Radius in pixels, for all or per axis. If callable, it receives the same arguments as
+        the decorated function and returns the radius, e.g. `lambda image, sigma: 4 * sigma`.
+    """
+    def decorator(function):
+        setattr(function, _FOOTPRINT_ATTRIBUTE, radius)
+        return function
+    return decorator
+
+
+def get_footprint(function, arguments=None, ndim: int = None):
+    """
+    Returns the radius per axis a function declared using `spatial_footprint`.
+
+    Parameters
+    ----------
+    function: callable
+    arguments: list, optional
+        arguments the function is called with; necessary if the footprint is callable
+    ndim: int, optional
+        number of dimensions of the image
+
+    Returns
+    -------
+    tuple of int or None
+        None if the function didn't declare a footprint
+    """
+    radius = getattr(function, _FOOTPRINT_ATTRIBUTE, None)
+    if radius is None:
+        return None
+    if callable(radius):
+        radius = radius(*arguments)
+    if np.isscalar(radius):
+        if ndim is None:
+            return int(np.ceil(radius))
+        radius = [radius] * ndim
+    return tuple([int(np.ceil(r)) for r in radius])
+
+
+def bounding_box(indices):
+    """
+    Returns the region enclosing all given pixel positions.
+
+    Parameters
+    ----------
+    indices: tuple of arrays
+        pixel coordinates per axis, as returned by np.nonzero
+
+    Returns
+    -------
+    tuple of (int, int)
+        start and stop (exclusive) per axis
+    """
+    return tuple([(int(np.min(i)), int(np.max(i)) + 1) for i in indices])
+
+
+def painted_region(value, shape):
+    """
+    Returns the region modified by painting in a labels layer as reported by napari's
+    paint event.
+
+    Parameters
+    ----------
+    value: list
+        Value of the paint event. Depending on the napari version, a list of
+        (indices, old values, ...) tuples or of objects with a `slice_key` attribute.
+    shape: tuple of int
+        shape of the labels layer
+
+    Returns
+    -------
+    tuple of (int, int) or None
+        None if the region cannot be determined
+    """
+    region = None
+    for item in value:
+        if hasattr(item, "slice_key"):
+            item_region = tuple([slice_.indices(size)[:2] for slice_, size in zip(item.slice_key, shape)])
+        else:
+            item_region = bounding_box(item[0])
+        region = item_region if region is None else union_regions(region, item_region)
+    return region
+
+
+def union_regions(region1, region2):
+    """
+    Returns the smallest region enclosing both given regions. If either is None, None is
+    returned, meaning that the whole image is affected.
+    """
+    if region1 is None or region2 is None:
+        return None
+    return tuple([(min(a[0], b[0]), max(a[1], b[1])) for a, b in zip(region1, region2)])
+
+
+def dilate_region(region, radius, shape):
+    """
+    Enlarges a region by a radius in all directions, clipped to the image shape.
+
+    Parameters
+    ----------
+    region: tuple of (int, int)
+    radius: int or tuple of int
+    shape: tuple of int
+
+    Returns
+    -------
+    tuple of (int, int)
+    """
+    if np.isscalar(radius):
+        radius = [radius] * len(region)
+    return tuple([(max(0, start - r), min(size, stop + r)) for (start, stop), r, size in zip(region, radius, shape)])
+
+
+def region_slices(region):
+    return tuple([slice(start, stop) for start, stop in region])
+
+
+def recompute_region(function, arguments, region, previous):
+    """
+    Recomputes the result of a function in a region and patches it into a copy of the
+    previous result. The function must have declared a footprint using `spatial_footprint`.
+    Images among the arguments must have the same shape as the previous result.
+
+    Parameters
+    ----------
+    function: callable
+    arguments: list
+        arguments of the function
+    region: tuple of (int, int)
+        region of the output that should be recomputed
+    previous: ndarray
+        previous result of the function
+
+    Returns
+    -------
+    ndarray
+        the patched result
+    """
+    radius = get_footprint(function, arguments, previous.ndim)
+    if radius is None:
+        raise ValueError("Function " + function.__name__ + " has no spatial footprint")
+
+    # the recomputed output region depends on input pixels within the radius around it
+    input_region = dilate_region(region, radius, previous.shape)
+    cropped_arguments = []
+    for argument in arguments:
+        if is_image(argument):
+            if argument.shape != previous.shape:
+                raise ValueError("Cannot recompute region of " + function.__name__ + " for images of different shape")
+            argument = argument[region_slices(input_region)]
+        cropped_arguments.append(argument)
+
+    cropped_result = np.asarray(function(*cropped_arguments))
+
+    # cut out the region from the cropped result
+    inner = tuple([slice(start - input_start, stop - input_start)
+                   for (start, stop), (input_start, _) in zip(region, input_region)])
+
+    result = np.array(previous, copy=True)
+    result[region_slices(region)] = cropped_result[inner]
+    return result
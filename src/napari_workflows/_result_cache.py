@@ -0,0 +1,80 @@
+import threading
+from collections import OrderedDict
+
+
+class ResultCache():
+    """
+    Keeps results of workflow steps in memory, keyed by task fingerprint (see
+    `task_fingerprints`), so that a result can be reused when the same step is computed
+    with the same parameters on the same inputs again, e.g. after undo. If the cache
+    exceeds its size, the least recently used results are removed.
+
+    Results are stored by reference and must not be modified in place; results that are
+    going to be modified need to be removed using `discard_value` before.
+
+    Parameters
+    ----------
+    max_bytes: int, optional
+        maximum number of bytes the cached results may occupy
+    """
+
+    def __init__(self, max_bytes: int = 2 ** 30):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries.keys()
+
+    def get(self, key):
+        """
+        Returns a cached result or None.
+        """
+        with self._lock:
+            if key not in self._entries.keys():
+                self.misses = self.misses + 1
+                return None
+            self.hits = self.hits + 1
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key, data):
+        """
+        Adds a result to the cache. Results larger than the cache are not stored.
+        """
+        nbytes = int(getattr(data, "nbytes", 0))
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries.keys():
+                self.nbytes = self.nbytes - int(getattr(self._entries.pop(key), "nbytes", 0))
+            self._entries[key] = data
+            self.nbytes = self.nbytes + nbytes
+            while self.nbytes > self.max_bytes:
+                _, removed = self._entries.popitem(last=False)
+                self.nbytes = self.nbytes - int(getattr(removed, "nbytes", 0))
+
+    def discard(self, key):
+        with self._lock:
+            if key in self._entries.keys():
+                self.nbytes = self.nbytes - int(getattr(self._entries.pop(key), "nbytes", 0))
+
+    def discard_value(self, data):
+        """
+        Removes all entries storing the given object, e.g. the data of a layer that is
+        painted on.
+        """
+        with self._lock:
+            for key in [k for k, v in self._entries.items() if v is data]:
+                self.nbytes = self.nbytes - int(getattr(self._entries.pop(key), "nbytes", 0))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+import numpy as np
+from ._workflow import _remove_file
+
+
+class SharedResultStore():
+    """
+    Stores results of workflow steps in a local directory, keyed by task fingerprint (see
+    `task_fingerprints`), so that several processes, e.g. napari sessions of different users
+    on the same workstation, can share results instead of computing them again.
+
+    Results are written atomically and can be read concurrently. A process computing a
+    result can claim it, so that other processes wait for it instead of computing it as
+    well. If the stored results exceed the size limit, the least recently used ones are
+    removed.
+
+    Parameters
+    ----------
+    directory: str
+        directory shared by all processes; created if necessary
+    max_bytes: int, optional
+        maximum number of bytes of all stored results
+    claim_timeout: float, optional
+        seconds after which a claim is ignored, e.g. because the claiming process crashed
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 10 * 2 ** 30, claim_timeout: float = 600):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.claim_timeout = claim_timeout
+        os.makedirs(directory, exist_ok=True)
+
+    def _filename(self, key, extension=".npy"):
+        return os.path.join(self.directory, key + extension)
+
+    def __contains__(self, key):
+        return os.path.exists(self._filename(key))
+
+    def get(self, key):
+        """
+        Returns a stored result or None.
+        """
+        filename = self._filename(key)
+        try:
+            data = np.load(filename)
+        except (OSError, ValueError):
+            # not stored, evicted or removed meanwhile
+            return None
+        try:
+            # the access time decides what is evicted first
+            os.utime(filename)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key, data):
+        """
+        Stores a result and releases the claim on it. Only numpy arrays are stored.
+        """
+        try:
+            if not isinstance(data, np.ndarray) or data.dtype == object or data.nbytes > self.max_bytes:
+                return
+            if key not in self:
+                fd, temp_filename = tempfile.mkstemp(suffix=".incomplete", dir=self.directory)
+                try:
+                    with os.fdopen(fd, "wb") as stream:
+                        np.save(stream, data)
+                    os.replace(temp_filename, self._filename(key))
+                except BaseException:
+                    _remove_file(temp_filename)
+                    raise
+                self._evict()
+        finally:
+            self.release(key)
+
+    def claim(self, key):
+        """
+        Claims computing a result. Returns False if another process claimed it already and
+        the claim didn't time out.
+        """
+        filename = self._filename(key, ".claim")
+        try:
+            fd = os.open(filename, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            os.close(fd)
+            return True
+        except FileExistsError:
+            pass
+        try:
+            if time.time() - os.path.getmtime(filename) < self.claim_timeout:
+                return False
+        except OSError:
+            # released meanwhile
+            return self.claim(key)
+        # take over the outdated claim
+        os.utime(filename)
+        return True
+
+    def release(self, key):
+        _remove_file(self._filename(key, ".claim"))
+
+    def nbytes(self):
+        """
+        Returns the number of bytes of all stored results.
+        """
+        return sum([size for _, size, _ in self._entries()])
+
+    def _entries(self):
+        entries = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".npy"):
+                path = os.path.join(self.directory, filename)
+                try:
+                    status = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, status.st_size, status.st_mtime))
+        return entries
+
+    def _evict(self):
+        with self._lock():
+            entries = sorted(self._entries(), key=lambda e: e[2])
+            total = sum([size for _, size, _ in entries])
+            while total > self.max_bytes and len(entries) > 0:
+                path, size, _ = entries.pop(0)
+                _remove_file(path)
+                total = total - size
+
+    @contextmanager
+    def _lock(self):
+        """
+        Serializes eviction among processes.
+        """
+        with open(os.path.join(self.directory, ".lock"), "a") as stream:
+            try:
+                import fcntl
+            except ImportError:
+                # Windows: readers tolerate removed files, so eviction works without lock as well
+                yield
+                return
+            fcntl.flock(stream.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(stream.fileno(), fcntl.LOCK_UN)
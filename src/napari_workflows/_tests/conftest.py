@@ -0,0 +1,34 @@
+import pytest
+
+
+class HeadlessManager():
+    """
+    A WorkflowManager of a viewer model without window. Instead of the widgets that
+    produced the layers, it calls the functions in `widgets`, layer name -> function.
+    """
+
+    def __init__(self):
+        from napari.components import ViewerModel
+        from napari_workflows import WorkflowManager
+
+        self.viewer = ViewerModel()
+        self.manager = WorkflowManager(self.viewer, _for_testing=True)
+        self.widgets = {}
+        self.manager._run_widget = lambda layer: self.widgets[layer.name]()
+
+    def run_updates(self):
+        """
+        Updates invalid layers as the background thread of the manager would, until all
+        layers are valid.
+        """
+        while True:
+            result = self.manager._update_invalid_layer()
+            if result is not None:
+                self.viewer.layers[result[0]].data = result[1]
+            elif self.manager._search_first_invalid_layer(self.manager.workflow.roots()) is None:
+                return
+
+
+@pytest.fixture
+def headless_manager():
+    return HeadlessManager()
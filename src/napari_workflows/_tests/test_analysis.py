@@ -0,0 +1,47 @@
+def test_workflow_analysis(tmp_path):
+    from napari_workflows import Workflow, measure_costs
+    import numpy as np
+    import json
+
+    def add(image1, image2):
+        return image1 + image2
+
+    def negate(image):
+        return -image
+
+    # two independent branches joined at the end
+    w = Workflow()
+    w.set("input", np.zeros((10, 10), dtype=np.uint8))
+    w.set("a1", negate, "input")
+    w.set("a2", negate, "a1")
+    w.set("a3", negate, "a2")
+    w.set("b1", negate, "input")
+    w.set("result", add, "a3", "b1")
+
+    analysis = w.analyze()
+    assert analysis.critical_path == ["a1", "a2", "a3", "result"]
+    assert analysis.critical_path_cost == 4
+    assert analysis.total_cost == 5
+    assert analysis.max_parallel_width == 2
+    assert analysis.speedup_bound(1) == 1
+    assert analysis.speedup_bound(8) == 5 / 4
+
+    assert analysis.simulate(1)["duration"] == 5
+    assert analysis.simulate(2)["duration"] == 4
+    # input, and at most three intermediate results of 100 bytes each
+    assert analysis.simulate(1)["peak_memory"] <= 400
+
+    # measured costs make the other branch critical
+    analysis = w.analyze(costs={"b1": 10})
+    assert analysis.critical_path == ["b1", "result"]
+
+    costs, output_sizes = measure_costs(w)
+    assert sorted(costs.keys()) == ["a1", "a2", "a3", "b1", "result"]
+    assert output_sizes["result"] == 100
+
+    filename = str(tmp_path / "report.json")
+    w.analyze(costs, output_sizes).save(filename, num_workers=[1, 2])
+    with open(filename) as stream:
+        report = json.load(stream)
+    assert [row["num_workers"] for row in report["workers"]] == [1, 2]
+    assert "Critical path: a1 -> a2 -> a3 -> result" in w.analyze().to_markdown()
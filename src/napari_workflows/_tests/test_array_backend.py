@@ -0,0 +1,50 @@
+def test_backend_dispatch_converts_once():
+    from napari_workflows import Workflow, ArrayBackendDispatcher, requires_array_backend
+    import numpy as np
+    import dask.array as da
+
+    @requires_array_backend("numpy")
+    def numpy_only(image, offset=1):
+        assert isinstance(image, np.ndarray)
+        return image + offset
+
+    def add(image1, image2):
+        return image1 + image2
+
+    w = Workflow()
+    w.set("input", da.from_array(np.ones((10, 10)), chunks=(5, 5)))
+    w.set("doubled", add, "input", "input")
+    w.set("numpy1", numpy_only, "input", 1)
+    w.set("numpy2", numpy_only, "input", 2)
+    w.set("sum", add, "numpy1", "numpy2")
+
+    dispatcher = ArrayBackendDispatcher(w)
+
+    result = dispatcher.get("doubled")
+    assert dispatcher.conversions == 0
+    assert dispatcher.namespaces["doubled"] == "dask"
+
+    result = dispatcher.get("sum")
+    assert np.array_equal(result, np.ones((10, 10)) * 5)
+    # the dask input is converted to numpy once although two steps need it
+    assert dispatcher.conversions == 1
+    assert dispatcher.namespaces["input"] == "dask"
+    assert dispatcher.namespaces["numpy1"] == "numpy"
+    assert dispatcher.namespaces["sum"] == "numpy"
+
+
+def test_backend_requirements_per_task():
+    from napari_workflows import Workflow, ArrayBackendDispatcher, array_namespace
+    import numpy as np
+
+    def invert(image):
+        return -image
+
+    w = Workflow()
+    w.set("input", np.ones((4, 4)))
+    w.set("inverted", invert, "input")
+
+    dispatcher = ArrayBackendDispatcher(w, requirements={"inverted": "dask"})
+    result = dispatcher.get("inverted")
+    assert array_namespace(result) == "dask"
+    assert dispatcher.conversions == 1
@@ -0,0 +1,41 @@
+def test_batch_runner():
+    from napari_workflows import Workflow, BatchRunner, batchable
+    import numpy as np
+
+    @batchable
+    def threshold(image, value=0.5):
+        return image > value
+
+    def count(binary):
+        # works on single images only
+        assert binary.ndim == 2
+        return binary.sum()
+
+    w = Workflow()
+    w.set("binary", threshold, "input", 0.5)
+    w.set("count", count, "binary")
+
+    inputs = [np.random.random((8, 8)) for _ in range(5)] + [np.ones((3, 3))]
+
+    runner = BatchRunner(w)
+    results = runner.get("count", inputs)
+
+    assert len(results) == 6
+    for image, result in zip(inputs, results):
+        assert result == (image > 0.5).sum()
+
+    # one call per shape group for the batchable step, one call per image for the other one
+    assert runner.batched_calls == 2
+    assert runner.single_calls == 6
+
+    # not declared batch-capable: every item is processed individually
+    def invert(image):
+        assert image.ndim == 2
+        return 1 - image
+
+    w.set("inverted", invert, "input")
+    runner = BatchRunner(w, batchable_tasks=[])
+    inverted = runner.get("inverted", [{"input": i} for i in inputs])
+    assert np.array_equal(inverted[1], 1 - inputs[1])
+    assert runner.single_calls == len(inputs)
+    assert runner.batched_calls == 0
@@ -0,0 +1,75 @@
+def test_generate_batch_script(tmp_path):
+    from napari_workflows import Workflow, generate_batch_script
+    from skimage.filters import gaussian, threshold_otsu
+    from skimage.measure import label
+    from skimage.io import imread
+    from tifffile import imwrite
+    import numpy as np
+    import subprocess
+    import sys
+
+    w = Workflow()
+    w.set("denoised", gaussian, "input", sigma=1)
+    w.set("labeled", label, "denoised")
+    w.set("unused", threshold_otsu, "denoised")
+
+    code = generate_batch_script(w, outputs=["labeled"])
+    assert "import napari" not in code
+    assert "threshold_otsu" not in code
+
+    script = tmp_path / "script.py"
+    script.write_text(code)
+
+    input_folder = tmp_path / "input"
+    input_folder.mkdir()
+    for i in range(3):
+        imwrite(str(input_folder / ("image" + str(i) + ".tif")), (np.random.random((20, 20)) > 0.5).astype(np.uint8))
+
+    output_folder = tmp_path / "output"
+    result = subprocess.run([sys.executable, str(script), str(input_folder), str(output_folder), "--workers", "2"],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert "Processing 3 inputs" in result.stdout
+    assert imread(str(output_folder / "labeled" / "image0.tif")).shape == (20, 20)
+
+    # finished inputs are skipped
+    result = subprocess.run([sys.executable, str(script), str(input_folder), str(output_folder)],
+                            capture_output=True, text=True)
+    assert "Processing 0 inputs" in result.stdout
+
+    # threads processing several inputs at once, e.g. as calibrated
+    code = generate_batch_script(w, outputs=["labeled"], executor_config={"executor": "threads", "num_workers": 2, "chunksize": 2})
+    script.write_text(code)
+    output_folder = tmp_path / "output_threads"
+    result = subprocess.run([sys.executable, str(script), str(input_folder), str(output_folder)],
+                            capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert "Processing 3 inputs" in result.stdout
+    assert result.stdout.count("Done:") == 3
+
+
+def test_batch_script_rejects_other_images():
+    from napari_workflows import Workflow, generate_batch_script
+    from skimage.filters import gaussian
+    from skimage.measure import label
+    from skimage.morphology import reconstruction
+    import numpy as np
+    import pytest
+
+    w = Workflow()
+    w.set("blurred", gaussian, "input", sigma=1)
+    w.set("reconstructed", reconstruction, "blurred", "mask")
+
+    # "mask" may be a string parameter, unless it is known as image
+    generate_batch_script(w, input_name="input")
+    with pytest.raises(ValueError):
+        generate_batch_script(w, image_names=["input", "mask"])
+
+    w.set("mask", np.ones((10, 10)))
+    with pytest.raises(ValueError):
+        generate_batch_script(w, input_name="input")
+
+    w = Workflow()
+    w.set("labels", label, np.ones((10, 10)))
+    with pytest.raises(ValueError):
+        generate_batch_script(w)
@@ -0,0 +1,89 @@
+def test_checkpoint_resume(tmp_path):
+    from napari_workflows import Workflow, CheckpointExecutor
+    import numpy as np
+
+    calls = []
+
+    def add_constant(image, constant):
+        calls.append(constant)
+        return image + constant
+
+    def crash(image):
+        raise RuntimeError("crash")
+
+    w = Workflow()
+    w.set("input", np.zeros((4, 4)))
+    w.set("step1", add_constant, "input", 1)
+    w.set("step2", add_constant, "step1", 2)
+    w.set("step3", crash, "step2")
+
+    directory = str(tmp_path / "checkpoints")
+    executor = CheckpointExecutor(w, directory)
+    try:
+        executor.get("step3")
+    except RuntimeError:
+        pass
+    assert sorted(executor.computed) == ["step1", "step2"]
+
+    # resume after fixing the last step: only the missing result is computed
+    w.set("step3", add_constant, "step2", 3)
+    calls.clear()
+    result = CheckpointExecutor(w, directory).get("step3")
+    assert np.all(result == 6)
+    assert calls == [3]
+
+    # a changed parameter makes the result of the step and its followers stale
+    w.set("step2", add_constant, "step1", 20)
+    calls.clear()
+    executor = CheckpointExecutor(w, directory)
+    assert np.all(executor.get("step3") == 24)
+    assert calls == [20, 3]
+    assert executor.loaded == ["step1"]
+    assert sorted(executor.invalid) == ["step2", "step3"]
+
+
+def test_checkpoint_corrupted(tmp_path):
+    from napari_workflows import Workflow, CheckpointExecutor
+    import numpy as np
+    import os
+
+    def add_one(image):
+        return image + 1
+
+    w = Workflow()
+    w.set("input", np.zeros((4, 4)))
+    w.set("result", add_one, "input")
+
+    directory = str(tmp_path)
+    executor = CheckpointExecutor(w, directory)
+    executor.get("result")
+    filename = os.path.join(directory, executor.read_manifest()["result"]["file"])
+    np.save(filename, np.zeros((4, 4)))
+
+    executor = CheckpointExecutor(w, directory)
+    assert np.all(executor.get("result") == 1)
+    assert executor.invalid == ["result"]
+    assert executor.computed == ["result"]
+
+
+def test_checkpoint_function_changed(tmp_path):
+    from napari_workflows import Workflow, CheckpointExecutor
+    import numpy as np
+
+    def scale(image):
+        return image * 2
+
+    w = Workflow()
+    w.set("input", np.ones((4, 4)))
+    w.set("result", scale, "input")
+    assert np.all(CheckpointExecutor(w, str(tmp_path)).get("result") == 2)
+
+    # same name, fixed code
+    def scale(image):
+        return image * 3
+
+    w.set("result", scale, "input")
+    executor = CheckpointExecutor(w, str(tmp_path))
+    assert np.all(executor.get("result") == 3)
+    assert executor.invalid == ["result"]
+    assert executor.computed == ["result"]
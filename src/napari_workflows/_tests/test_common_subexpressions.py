@@ -0,0 +1,83 @@
+def test_deduplicate_identical_tasks():
+    from napari_workflows import Workflow, DeduplicatingExecutor, find_common_subexpressions
+    from skimage.filters import gaussian
+    import numpy as np
+
+    calls = []
+
+    def count_calls(image, sigma):
+        calls.append(sigma)
+        return gaussian(image, sigma)
+
+    def add(image1, image2):
+        return image1 + image2
+
+    w = Workflow()
+    w.set("input", np.random.random((10, 10)))
+    w.set("blurred1", count_calls, "input", 2)
+    w.set("blurred2", count_calls, "input", 2)
+    w.set("blurred3", count_calls, "input", 3)
+    # identical follow-up steps of the duplicates are duplicates, too
+    w.set("sum1", add, "blurred1", "blurred3")
+    w.set("sum2", add, "blurred2", "blurred3")
+    w.set("total", add, "sum1", "sum2")
+
+    assert find_common_subexpressions(w) == {"blurred2": "blurred1", "sum2": "sum1"}
+
+    expected = w.get("total")
+    assert len(calls) == 3
+    calls.clear()
+
+    executor = DeduplicatingExecutor(w)
+    result = executor.get("total")
+    assert np.allclose(result, expected)
+    assert len(calls) == 2
+    assert executor.deduplicated == {"blurred2": "blurred1", "sum2": "sum1"}
+
+    # requesting a duplicate returns the result of the other task
+    assert np.allclose(executor.get("blurred2"), w.get("blurred1"))
+
+
+def test_distinct_functions_are_not_merged():
+    from napari_workflows import Workflow, DeduplicatingExecutor, find_common_subexpressions
+
+    class Model():
+        def __init__(self, factor):
+            self.factor = factor
+
+        def predict(self, value):
+            return value * self.factor
+
+    w = Workflow()
+    w.set("input", 1.0)
+    w.set("a", lambda x: x + 1, "input")
+    w.set("b", lambda x: x * 10, "input")
+    w.set("c", Model(2).predict, "input")
+    w.set("d", Model(3).predict, "input")
+
+    assert find_common_subexpressions(w) == {}
+
+    executor = DeduplicatingExecutor(w)
+    assert executor.get("a") == 2.0
+    assert executor.get("b") == 10.0
+    assert executor.get("c") == 2.0
+    assert executor.get("d") == 3.0
+
+
+def test_function_tokens_are_cached():
+    from napari_workflows._fingerprint import function_token
+
+    pickled = []
+
+    class Model():
+        def __getstate__(self):
+            pickled.append(self)
+            return {}
+
+        def predict(self, value):
+            return value
+
+    predict = Model().predict
+    token = function_token(predict)
+    assert function_token(predict) == token
+    assert len(pickled) == 1
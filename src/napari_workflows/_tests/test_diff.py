@@ -0,0 +1,39 @@
+def test_diff_and_rerun_changed():
+    from napari_workflows import Workflow, diff_workflows, rerun_changed
+    from skimage.filters import gaussian
+    from skimage.measure import label
+    import numpy as np
+
+    def threshold(image, value):
+        return image > value
+
+    def count(labels):
+        return labels.max()
+
+    old = Workflow()
+    old.set("input", np.random.random((20, 20)))
+    old.set("blurred", gaussian, "input", 1)
+    old.set("binary", threshold, "blurred", 0.5)
+    old.set("labels", label, "binary")
+    old.set("sobel_of_blurred", gaussian, "blurred", 2)
+    results = {name: old.get(name) for name in ["blurred", "binary", "labels", "sobel_of_blurred"]}
+
+    new = Workflow()
+    new.set("input", old.get("input"))
+    new.set("blurred", gaussian, "input", 1)
+    new.set("binary", threshold, "blurred", 0.6)
+    new.set("labels", label, "binary")
+    new.set("count", count, "labels")
+
+    diff = diff_workflows(old, new)
+    assert diff.added == ["count"]
+    assert diff.removed == ["sobel_of_blurred"]
+    assert diff.changed == ["binary"]
+    assert diff.affected == ["binary", "labels", "count"]
+    assert diff.unchanged == ["blurred"]
+    assert not diff_workflows(new, new)
+
+    new_results, computed = rerun_changed(old, new, results)
+    assert sorted(new_results.keys()) == ["binary", "count", "labels"]
+    assert sorted(computed) == ["binary", "count", "labels"]
+    assert np.all(new_results["labels"] == new.get("labels"))
@@ -191,3 +191,28 @@ def test_loaded_workflow_is_executable():
     w1 = load_workflow(filename)
     w1.set("input", np.random.random((10,10)))
     w1.get("denoised")
+
+def test_topological_order():
+    from napari_workflows import Workflow
+    from napari_workflows._workflow import _topological_order, _module_metadata
+    from skimage.filters import gaussian
+    from skimage.measure import label
+
+    def threshold(image, value):
+        return image > value
+
+    w = Workflow()
+    # define the tasks in reverse order
+    w.set("labeled", label, "binarized")
+    w.set("binarized", threshold, "denoised", 0.5)
+    w.set("denoised", gaussian, "input", sigma=2)
+
+    roots, order = _topological_order(w._tasks)
+    assert roots == w.roots()
+    assert order == ["denoised", "binarized", "labeled"]
+
+    # module introspection is cached
+    _module_metadata.cache_clear()
+    _module_metadata("skimage")
+    _module_metadata("skimage")
+    assert _module_metadata.cache_info().hits == 1
@@ -0,0 +1,64 @@
+def test_instrumentation_exporters(tmp_path):
+    from napari_workflows import Instrumentation, JsonLinesExporter, PrometheusTextExporter
+    import json
+
+    instrumentation = Instrumentation()
+    received = []
+    instrumentation.connect("layer_updated", lambda event, values: received.append((event, values)))
+    instrumentation.connect("*", lambda event, values: received.append(("*", event)))
+
+    json_file = str(tmp_path / "events.jsonl")
+    prometheus_file = str(tmp_path / "metrics.prom")
+    instrumentation.add_exporter(JsonLinesExporter(json_file))
+    instrumentation.add_exporter(PrometheusTextExporter(prometheus_file))
+
+    instrumentation.increment("recomputations_total")
+    instrumentation.increment("recomputations_total", 2)
+    instrumentation.observe("update_seconds", 0.002)
+    instrumentation.observe("update_seconds", 2)
+    instrumentation.emit("layer_updated", layer="blurred", mode="full")
+    instrumentation.export()
+
+    assert received == [("layer_updated", {"layer": "blurred", "mode": "full"}), ("*", "layer_updated")]
+
+    metrics = instrumentation.metrics()
+    assert metrics["counters"]["recomputations_total"] == 3
+    assert metrics["histograms"]["update_seconds"]["count"] == 2
+    assert metrics["histograms"]["update_seconds"]["max"] == 2
+
+    with open(json_file) as stream:
+        records = [json.loads(line) for line in stream]
+    assert records[0]["event"] == "layer_updated"
+    assert records[0]["layer"] == "blurred"
+    assert records[1]["event"] == "metrics"
+    assert records[1]["counters"]["recomputations_total"] == 3
+
+    with open(prometheus_file) as stream:
+        text = stream.read()
+    assert "napari_workflows_recomputations_total 3" in text
+    assert 'napari_workflows_update_seconds_bucket{le="0.005"} 1' in text
+    assert 'napari_workflows_update_seconds_bucket{le="+Inf"} 2' in text
+    assert "napari_workflows_update_seconds_count 2" in text
+
+
+def test_workflow_instrumentation():
+    from napari_workflows import Workflow, Instrumentation
+    import numpy as np
+
+    def add(image1, image2):
+        return image1 + image2
+
+    w = Workflow()
+    w.instrumentation = Instrumentation()
+    events = []
+    w.instrumentation.connect("workflow_get", lambda event, values: events.append(values["name"]))
+
+    w.set("input", np.ones((3, 3)))
+    w.set("sum", add, "input", "input")
+    assert np.all(w.get("sum") == 2)
+
+    metrics = w.instrumentation.metrics()
+    assert metrics["counters"]["workflow_modifications_total"] == 2
+    assert metrics["counters"]["workflow_get_total"] == 1
+    assert metrics["histograms"]["workflow_get_seconds"]["count"] == 1
+    assert events == ["sum"]
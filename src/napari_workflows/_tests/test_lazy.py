@@ -0,0 +1,94 @@
+def test_lazy_result_computes_planes_on_demand():
+    from napari_workflows import Workflow, spatial_footprint
+    from napari_workflows._lazy import lazy_result
+    from scipy.ndimage import uniform_filter
+    import numpy as np
+
+    processed_planes = []
+
+    @spatial_footprint(1)
+    def mean_filter(image):
+        processed_planes.append(image.shape[0])
+        return uniform_filter(image, size=3)
+
+    @spatial_footprint(0)
+    def threshold(image, value):
+        return image > value
+
+    def invert(image):
+        # no footprint declared: needs the whole image
+        return np.logical_not(image)
+
+    image = np.random.random((20, 10, 10))
+    w = Workflow()
+    w.set("input", image)
+    w.set("blurred", mean_filter, "input")
+    w.set("blurred_again", mean_filter, "blurred")
+    w.set("binary", threshold, "blurred_again", 0.5)
+    w.set("inverted", invert, "binary")
+
+    expected = w.get("binary")
+    processed_planes.clear()
+
+    lazy = lazy_result(w, "binary")
+    assert lazy.shape == image.shape
+    processed_planes.clear()
+
+    plane = lazy[10].compute()
+    assert np.array_equal(plane, expected[10])
+    # only the neighborhood of the plane was processed
+    assert sum(processed_planes) < image.shape[0]
+
+    assert np.array_equal(lazy.compute(), expected)
+
+    processed_planes.clear()
+    lazy = lazy_result(w, "inverted")
+    assert np.array_equal(lazy[10].compute(), np.logical_not(expected[10]))
+    assert sum(processed_planes) >= 2 * image.shape[0]
+
+    # known results can be passed and are not recomputed
+    processed_planes.clear()
+    lazy = lazy_result(w, "binary", inputs={"blurred_again": uniform_filter(uniform_filter(image, 3), 3)})
+    assert np.array_equal(lazy.compute(), expected)
+    assert len(processed_planes) == 0
+
+
+def test_manager_updates_lazily(headless_manager):
+    from napari_workflows import spatial_footprint
+    from scipy.ndimage import uniform_filter
+    import numpy as np
+
+    calls = []
+
+    @spatial_footprint(1)
+    def mean_filter(image):
+        calls.append(image.shape)
+        return uniform_filter(image, size=3)
+
+    viewer = headless_manager.viewer
+    manager = headless_manager.manager
+    manager.lazy_update = True
+    # time-lapse of volumes
+    image = viewer.add_image(np.random.random((3, 4, 10, 10)), name="image")
+    viewer.dims.set_current_step(0, 1)
+    expected = uniform_filter(uniform_filter(image.data[1], size=3), size=3)
+
+    blurred = viewer.add_image(np.zeros((4, 10, 10)), name="blurred")
+    manager.update(blurred, mean_filter, image.data)
+    blurred_again = viewer.add_image(np.zeros((4, 10, 10)), name="blurred_again")
+    manager.update(blurred_again, mean_filter, blurred.data)
+    manager.invalidate(["blurred"])
+
+    for _ in range(2):
+        name, data = manager._update_invalid_layer()
+        viewer.layers[name].data = data
+    # only the current time point is processed
+    assert viewer.layers["blurred_again"].data.shape == (4, 10, 10)
+
+    calls.clear()
+    headless_manager.run_updates()
+    assert isinstance(blurred_again.data, np.ndarray)
+    assert np.allclose(blurred_again.data, expected)
+    # blurred was computed once, in the background, and reused for blurred_again:
+    # one call per plane and layer
+    assert len(calls) == 2 * 4
@@ -0,0 +1,65 @@
+def test_memory_budget_spills_intermediates():
+    from napari_workflows import Workflow, MemoryBudgetExecutor
+    import numpy as np
+
+    def add(image1, image2):
+        return image1 + image2
+
+    def plus_one(image):
+        return image + 1
+
+    image = np.ones((100, 100))  # 80 kB
+
+    w = Workflow()
+    w.set("input", image)
+    w.set("a", plus_one, "input")
+    w.set("b", plus_one, "a")
+    w.set("c", plus_one, "b")
+    w.set("sum1", add, "a", "c")
+    w.set("sum2", add, "sum1", "b")
+
+    expected = w.get("sum2")
+
+    # enough memory: nothing is spilled
+    executor = MemoryBudgetExecutor(w, memory_budget=10 * image.nbytes)
+    assert np.array_equal(executor.get("sum2"), expected)
+    assert executor.spilled_bytes == 0
+
+    # room for one intermediate only
+    executor = MemoryBudgetExecutor(w, memory_budget=image.nbytes)
+    result = executor.get("sum2")
+    assert np.array_equal(result, expected)
+    assert not isinstance(result, np.memmap)
+    assert executor.spilled_bytes > 0
+    assert executor.spilled_bytes == len(executor.spilled) * image.nbytes
+    assert executor.peak_bytes <= 2 * image.nbytes
+
+
+def test_intermediate_is_not_spilled_while_loading(tmp_path):
+    from napari_workflows._memory import _Intermediate
+    import numpy as np
+    import threading
+
+    data = np.random.random((10, 10))
+    intermediate = _Intermediate("blurred", data, 0)
+
+    # another step is loading it
+    with intermediate._lock:
+        assert not intermediate.spill(str(tmp_path))
+    assert intermediate.in_memory()
+
+    loaded = []
+
+    def load():
+        for _ in range(200):
+            loaded.append(intermediate.load())
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    while not intermediate.spill(str(tmp_path)):
+        pass
+    for thread in threads:
+        thread.join()
+    assert not intermediate.in_memory()
+    assert all([np.array_equal(d, data) for d in loaded])
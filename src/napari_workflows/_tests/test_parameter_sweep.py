@@ -0,0 +1,42 @@
+def test_parameter_sweep_reuses_prefixes():
+    from napari_workflows import Workflow, parameter_sweep
+    from skimage.filters import gaussian
+    import numpy as np
+
+    calls = {"blur": 0, "threshold": 0}
+
+    def blur(image, sigma=1):
+        calls["blur"] += 1
+        return gaussian(image, sigma)
+
+    def threshold(image, value=0.5):
+        calls["threshold"] += 1
+        return image > value
+
+    def count(binary):
+        return binary.sum()
+
+    image = np.random.random((20, 20))
+    w = Workflow()
+    w.set("input", image)
+    w.set("blurred", blur, "input", 1)
+    w.set("binary", threshold, "blurred", 0.5)
+    w.set("count", count, "binary")
+
+    rows = parameter_sweep(w, "count", {"blurred": {"sigma": [1, 2]}, "binary": {"value": [0.4, 0.5, 0.6]}})
+
+    assert len(rows) == 6
+    # the blur step is computed once per sigma only
+    assert calls["blur"] == 2
+    assert calls["threshold"] == 6
+    for row in rows:
+        expected = (gaussian(image, row["blurred.sigma"]) > row["binary.value"]).sum()
+        assert row["count"] == expected
+
+    # explicit combinations and metrics
+    calls["blur"] = 0
+    rows = parameter_sweep(w, ["binary"], [{"binary": {"value": 0.3}}, {"binary": {"value": 0.7}}],
+                           metrics={"area": np.sum})
+    assert calls["blur"] == 1
+    assert rows[0]["binary.value"] == 0.3
+    assert rows[0]["binary.area"] >= rows[1]["binary.area"]
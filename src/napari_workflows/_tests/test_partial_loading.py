@@ -0,0 +1,37 @@
+def test_partial_loading(tmp_path, monkeypatch):
+    from napari_workflows import Workflow
+    from napari_workflows._io_yaml_v1 import save_workflow, load_workflow, WorkflowFileIndex
+    import numpy as np
+    import sys
+    from skimage.filters import sobel
+
+    # functions in a module that isn't imported yet when loading the workflow
+    (tmp_path / "partial_loading_module.py").write_text(
+        "def negate(image):\n    return -image\n\n"
+        "def add(image1, image2):\n    return image1 + image2\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    import partial_loading_module
+
+    w = Workflow()
+    w.set("a", partial_loading_module.negate, "input")
+    w.set("b", partial_loading_module.add, "a", "input")
+    w.set("c", sobel, "b")
+    w.set("other", sobel, "input")
+    filename = str(tmp_path / "workflow.yaml")
+    save_workflow(filename, w)
+    del sys.modules["partial_loading_module"]
+
+    index = WorkflowFileIndex(filename)
+    assert index.keys() == ["a", "b", "c", "other"]
+    assert index.sources_of("b") == ["a", "input"]
+    assert index.required_keys("c") == ["a", "b", "c"]
+    assert "partial_loading_module" not in sys.modules
+
+    loaded = load_workflow(filename, targets="other")
+    assert list(loaded._tasks.keys()) == ["other"]
+    assert "partial_loading_module" not in sys.modules
+
+    loaded = load_workflow(filename, targets=["b"])
+    assert list(loaded._tasks.keys()) == ["a", "b"]
+    loaded.set("input", np.ones((2, 2)))
+    assert np.all(loaded.get("b") == 0)
@@ -0,0 +1,87 @@
+def test_recompute_region_matches_full_computation():
+    from napari_workflows import spatial_footprint
+    from napari_workflows._regions import bounding_box, dilate_region, recompute_region, union_regions, get_footprint
+    from scipy.ndimage import uniform_filter
+    import numpy as np
+
+    @spatial_footprint(lambda image, size: size // 2)
+    def mean_filter(image, size=3):
+        return uniform_filter(image, size=size)
+
+    image = np.random.random((30, 40))
+    previous = mean_filter(image, 5)
+    assert get_footprint(mean_filter, [image, 5], 2) == (2, 2)
+
+    # paint a few pixels
+    indices = (np.asarray([10, 11, 12]), np.asarray([0, 1, 2]))
+    image[indices] = 5
+    changed = bounding_box(indices)
+    assert changed == ((10, 13), (0, 3))
+
+    region = dilate_region(changed, get_footprint(mean_filter, [image, 5], 2), image.shape)
+    assert region == ((8, 15), (0, 5))
+
+    patched = recompute_region(mean_filter, [image, 5], region, previous)
+    assert np.allclose(patched, mean_filter(image, 5))
+    # the previous result is not modified
+    assert not np.allclose(previous, patched)
+
+    assert union_regions(((0, 2), (5, 6)), ((1, 4), (0, 1))) == ((0, 4), (0, 6))
+    assert union_regions(None, ((1, 4), (0, 1))) is None
+
+
+def test_painted_region():
+    from napari_workflows._regions import painted_region
+    from collections import namedtuple
+    import numpy as np
+
+    # older napari versions report indices and old values
+    value = [((np.asarray([3, 4]), np.asarray([5, 9])), np.asarray([0, 0]))]
+    assert painted_region(value, (10, 10)) == ((3, 5), (5, 10))
+
+    # newer napari versions report slices
+    Atom = namedtuple("Atom", ["slice_key", "mask"])
+    value = [Atom((slice(1, 4), slice(None, 2)), None), Atom((slice(2, 6), slice(0, 3)), None)]
+    assert painted_region(value, (10, 10)) == ((1, 6), (0, 3))
+
+
+def test_manager_recomputes_painted_region(headless_manager):
+    from napari_workflows import spatial_footprint
+    from scipy.ndimage import uniform_filter
+    import numpy as np
+
+    @spatial_footprint(1)
+    def mean_filter(image):
+        return uniform_filter(image.astype(float), size=3)
+
+    viewer = headless_manager.viewer
+    manager = headless_manager.manager
+    labels = viewer.add_labels(np.zeros((30, 40), dtype=np.uint32), name="labels")
+    blurred = viewer.add_image(mean_filter(labels.data), name="blurred")
+    manager.update(blurred, mean_filter, labels.data)
+
+    calls = []
+
+    def widget():
+        calls.append("blurred")
+        blurred.data = mean_filter(labels.data)
+    headless_manager.widgets["blurred"] = widget
+
+    labels.brush_size = 1
+    labels.paint((10, 20), 7)
+    assert manager._dirty_regions["blurred"] == ((10, 11), (20, 21))
+    assert manager._search_first_invalid_layer(manager.workflow.roots()) is blurred
+
+    name, data = manager._update_invalid_layer()
+    blurred.data = data
+    assert name == "blurred"
+    assert calls == []
+    assert np.allclose(blurred.data, mean_filter(labels.data))
+    assert manager._search_first_invalid_layer(manager.workflow.roots()) is None
+
+    # the hash of the labels is updated for the painted region, without hashing all labels
+    known = manager._root_hashes["labels"][1]
+    labels.paint((20, 5), 8)
+    assert manager._root_hashes["labels"][1] != known
+    name, data = manager._update_invalid_layer()
+    assert np.allclose(data, mean_filter(labels.data))
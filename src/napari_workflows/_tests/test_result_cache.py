@@ -0,0 +1,120 @@
+def test_result_cache():
+    from napari_workflows import ResultCache
+    import numpy as np
+
+    cache = ResultCache(max_bytes=250)
+    cache.put("a", np.zeros(100, dtype=np.uint8))
+    cache.put("b", np.zeros(100, dtype=np.uint8))
+    assert cache.get("a") is not None
+
+    # "b" is the least recently used one
+    cache.put("c", np.zeros(100, dtype=np.uint8))
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert len(cache) == 2
+    assert cache.nbytes == 200
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+    # too large to be cached
+    cache.put("d", np.zeros(300, dtype=np.uint8))
+    assert "d" not in cache
+
+
+def test_undo_restores_workflow_state():
+    from napari_workflows import Workflow
+    from napari_workflows._undo_redo_functionality import UndoRedoController
+    from skimage.filters import gaussian
+
+    w = Workflow()
+    restored = []
+    controller = UndoRedoController(w, None, restore=restored.append)
+    for sigma in [1, 2]:
+        controller.execute(lambda: w.set("blurred", gaussian, "input", sigma))
+
+    undone = controller.undo()
+    assert restored == [undone]
+    assert undone.get_task("blurred")[2] == 1
+    redone = controller.redo()
+    assert restored == [undone, redone]
+    assert redone.get_task("blurred")[2] == 2
+
+
+def test_manager_restores_results_on_undo(headless_manager):
+    from skimage.filters import gaussian
+    import numpy as np
+
+    viewer = headless_manager.viewer
+    manager = headless_manager.manager
+    image = viewer.add_image(np.random.random((20, 20)), name="image")
+    blurred = viewer.add_image(np.zeros((20, 20)), name="blurred")
+
+    # the widget computes the result using the parameters it shows
+    widget_sigma = []
+
+    def widget():
+        widget_sigma.append(widget_sigma[-1])
+        blurred.data = gaussian(image.data, widget_sigma[-1])
+    headless_manager.widgets["blurred"] = widget
+
+    for sigma in [1, 2, 3]:
+        widget_sigma.append(sigma)
+        manager.update(blurred, gaussian, image.data, sigma)
+        manager.invalidate(["blurred"])
+        headless_manager.run_updates()
+    assert widget_sigma == [1, 1, 2, 2, 3, 3]
+
+    # restored from the cache right away
+    manager.undo_redo_controller.undo()
+    assert np.allclose(blurred.data, gaussian(image.data, 2))
+    assert manager._search_first_invalid_layer(manager.workflow.roots()) is None
+    counters = manager.instrumentation.metrics()["counters"]
+    assert counters["cache_hits_total"] == 1
+    assert counters["recomputations_total"] == 3
+
+    # computed using the restored parameters, not the ones shown in the widget
+    manager.result_cache.clear()
+    manager.undo_redo_controller.undo()
+    headless_manager.run_updates()
+    assert np.allclose(blurred.data, gaussian(image.data, 1))
+    assert manager.workflow.get_task("blurred")[2] == 1
+    assert widget_sigma == [1, 1, 2, 2, 3, 3]
+
+
+def test_manager_does_not_restore_followers_of_painted_results(headless_manager):
+    from skimage.measure import label
+    import numpy as np
+
+    def count_labels(labels):
+        return labels * 0 + labels.max()
+
+    viewer = headless_manager.viewer
+    manager = headless_manager.manager
+    image = viewer.add_image(np.zeros((20, 20)), name="image")
+    image.data[2:5, 2:5] = 1
+    labels = viewer.add_labels(np.zeros((20, 20), dtype=np.int32), name="labels")
+    counted = viewer.add_image(np.zeros((20, 20)), name="counted")
+
+    def make_labels():
+        labels.data = label(image.data > 0).astype(np.int32)
+
+    def count():
+        counted.data = count_labels(labels.data)
+    headless_manager.widgets["labels"] = make_labels
+    headless_manager.widgets["counted"] = count
+    manager.update(labels, label, image.data)
+    manager.update(counted, count_labels, labels.data)
+    manager.invalidate(["labels", "counted"])
+    headless_manager.run_updates()
+    assert counted.data.max() == 1
+
+    # the painted labels don't match their task anymore, neither does the cached count
+    labels.brush_size = 1
+    labels.paint((10, 10), 5)
+    headless_manager.run_updates()
+    assert labels.data.max() == 5
+    assert counted.data.max() == 5
+
+    labels.paint((15, 15), 7)
+    headless_manager.run_updates()
+    assert counted.data.max() == 7
@@ -0,0 +1,76 @@
+def test_shared_result_store(tmp_path):
+    from napari_workflows import SharedResultStore
+    import numpy as np
+    import os
+    import time
+
+    directory = str(tmp_path / "store")
+    # e.g. two napari sessions
+    store1 = SharedResultStore(directory, max_bytes=2500)
+    store2 = SharedResultStore(directory, max_bytes=2500)
+
+    assert store1.claim("a")
+    assert not store2.claim("a")
+    store1.put("a", np.ones((10, 100), dtype=np.uint8))
+    assert np.all(store2.get("a") == 1)
+    assert store2.claim("a")
+    store2.release("a")
+
+    # "a" was read recently, "b" is evicted first
+    store2.put("b", np.zeros((10, 100), dtype=np.uint8))
+    past = time.time() - 100
+    os.utime(os.path.join(directory, "b.npy"), (past, past))
+    store1.put("c", np.zeros((10, 100), dtype=np.uint8))
+    assert "a" in store1
+    assert "b" not in store1
+    assert "c" in store1
+    assert store2.get("b") is None
+    assert store1.nbytes() <= 2500
+
+    # claims of crashed sessions time out
+    store3 = SharedResultStore(directory, claim_timeout=0)
+    assert store1.claim("d")
+    assert store3.claim("d")
+
+
+def test_manager_shares_results(tmp_path, headless_manager):
+    from napari_workflows import SharedResultStore
+    from skimage.filters import gaussian
+    import numpy as np
+
+    viewer = headless_manager.viewer
+    manager = headless_manager.manager
+    manager.shared_store = SharedResultStore(str(tmp_path))
+    image = viewer.add_image(np.random.random((20, 20)), name="image")
+
+    calls = []
+    for name, sigma in [("blurred", 2), ("other", 3)]:
+        layer = viewer.add_image(np.zeros((20, 20)), name=name)
+
+        def widget(layer=layer, sigma=sigma):
+            calls.append(layer.name)
+            layer.data = gaussian(image.data, sigma)
+        headless_manager.widgets[name] = widget
+        manager.update(layer, gaussian, image.data, sigma)
+    manager.invalidate(["blurred", "other"])
+
+    # another session is computing "blurred": it is skipped and "other" is computed meanwhile
+    fingerprint = manager._result_fingerprints()["blurred"]
+    other_session = SharedResultStore(str(tmp_path))
+    assert other_session.claim(fingerprint)
+    assert manager._update_invalid_layer() is None
+    assert manager._update_invalid_layer() is None
+    assert calls == ["other"]
+    # stored for other sessions, and claim released
+    assert manager._result_fingerprints()["other"] in other_session
+    assert other_session.claim(manager._result_fingerprints()["other"])
+
+    # its result is taken from the store once the other session stored it
+    other_session.put(fingerprint, gaussian(image.data, 2))
+    name, data = manager._update_invalid_layer()
+    assert name == "blurred"
+    assert np.allclose(data, gaussian(image.data, 2))
+    assert calls == ["other"]
+    counters = manager.instrumentation.metrics()["counters"]
+    assert counters["recomputations_total"] == 1
+    assert counters["cache_hits_total"] == 1
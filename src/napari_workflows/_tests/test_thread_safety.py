@@ -0,0 +1,153 @@
+def test_concurrent_readers_and_writers():
+    from napari_workflows import Workflow
+    import numpy as np
+    import threading
+
+    def add(image1, image2):
+        return image1 + image2
+
+    w = Workflow()
+    w.set("input", np.ones((5, 5)))
+    w.set("step0", add, "input", "input")
+
+    errors = []
+    stop = threading.Event()
+
+    def write(thread_index):
+        try:
+            for i in range(300):
+                name = "step" + str(thread_index) + "_" + str(i)
+                w.set(name, add, "step0", "input")
+                if i % 3 == 0:
+                    w.remove(name)
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            while not stop.is_set():
+                w.roots()
+                w.leafs()
+                w.followers_of("step0")
+                w.sources_of("step0")
+                str(w)
+                assert np.array_equal(w.get("step0"), np.ones((5, 5)) * 2)
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    writers = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    stop.set()
+    for t in readers:
+        t.join()
+
+    assert len(errors) == 0, errors
+    # no modification got lost: every writer added 300 tasks and removed a third of them
+    assert len(w._tasks) == 2 + 4 * 200
+    assert set(w.followers_of("step0")) == set([k for k in w._tasks.keys() if k.startswith("step") and k != "step0"])
+
+    w.remove_all_except(["input", "step0"])
+    assert w.leafs() == ["step0"]
+
+
+def test_workflow_copy_and_save_keep_tasks_only(tmp_path):
+    from napari_workflows import Workflow
+    from napari_workflows._io_yaml_v1 import save_workflow, load_workflow
+    from skimage.filters import gaussian
+    import copy
+
+    w = Workflow()
+    w.set("denoised", gaussian, "input", sigma=2)
+    w.followers_of("input")
+
+    filename = str(tmp_path / "workflow.yaml")
+    save_workflow(filename, w)
+    with open(filename) as stream:
+        content = stream.read()
+    assert "lock" not in content
+    assert "index" not in content
+
+    loaded = load_workflow(filename)
+    loaded.set("blurred", gaussian, "denoised", sigma=3)
+    assert loaded.followers_of("denoised") == ["blurred"]
+
+    copied = copy.deepcopy(w)
+    copied.remove("denoised")
+    assert len(w._tasks) == 1
+
+
+def test_set_binding_and_set_many():
+    from napari_workflows import Workflow
+    from napari_workflows._workflow import _bind_arguments
+    import inspect
+    import pytest
+
+    def step(image, radius=1, mode="nearest", *, offset=0):
+        return image
+
+    def simple(image, radius=1, mode="nearest"):
+        return image
+
+    # the fast path agrees with inspect
+    for function in [step, simple]:
+        for args, kwargs in [(("input",), {}), (("input", 2), {"mode": "reflect"}), (("input",), {"radius": 3})]:
+            bound = inspect.signature(function).bind(*args, **kwargs)
+            bound.apply_defaults()
+            assert _bind_arguments(function, args, kwargs) == list(bound.arguments.values())
+    with pytest.raises(TypeError):
+        _bind_arguments(simple, ("input", 2), {"radius": 3})
+    with pytest.raises(TypeError):
+        _bind_arguments(simple, (), {})
+
+    w = Workflow()
+    w.set("blurred", simple, "input", 2)
+    tasks = w._task_dict
+    # setting identical parameters doesn't replace the task dictionary
+    w.set("blurred", simple, "input", radius=2)
+    assert w._task_dict is tasks
+    w.set("blurred", simple, "input", 3)
+    assert w.get_task("blurred") == (simple, "input", 3, "nearest")
+
+    w.set_many({"a": (simple, "blurred"), "b": (simple, "a")})
+    assert w.followers_of("blurred") == ["a"]
+    assert w.followers_of("a") == ["b"]
+
+    # cached signatures don't keep functions and the images they captured alive
+    import gc
+    import numpy as np
+    import weakref
+
+    def make_step():
+        background = np.zeros((100, 100))
+
+        def subtract_background(image, scale=1):
+            return image - scale * background
+        return subtract_background
+
+    subtract_background = make_step()
+    _bind_arguments(subtract_background, ("input",), {})
+    reference = weakref.ref(subtract_background)
+    del subtract_background
+    gc.collect()
+    assert reference() is None
+
+
+def test_tasks_are_read_only():
+    from napari_workflows import Workflow
+    from skimage.filters import gaussian
+    import pytest
+
+    w = Workflow()
+    w.set("blurred", gaussian, "input", sigma=1)
+    assert w.followers_of("input") == ["blurred"]
+
+    with pytest.raises(TypeError):
+        w._tasks["labeled"] = (gaussian, "blurred")
+
+    # replacing the dictionary keeps the followers up to date
+    w._tasks = dict(w._tasks, labeled=(gaussian, "blurred"))
+    assert w.followers_of("blurred") == ["labeled"]
@@ -0,0 +1,42 @@
+def test_calibrate_executor(tmp_path):
+    from napari_workflows import Workflow, run_batch, calibrate_executor, save_executor_config, load_executor_config
+    from napari_workflows import generate_batch_script
+    from napari_workflows._io_yaml_v1 import save_workflow, load_workflow
+    from skimage.filters import gaussian
+    from skimage.measure import label
+    import numpy as np
+
+    w = Workflow()
+    w.set("blurred", gaussian, "input", sigma=1)
+    w.set("labels", label, "blurred")
+    samples = [np.random.random((32, 32)) > 0.5 for i in range(4)]
+
+    configurations = [
+        {"executor": "threads", "num_workers": 1, "chunksize": 1},
+        {"executor": "threads", "num_workers": 2, "chunksize": 2},
+        {"executor": "processes", "num_workers": 2, "chunksize": 2},
+        # exceeds the memory limit and won't be run
+        {"executor": "threads", "num_workers": 100000, "chunksize": 1},
+    ]
+    best = calibrate_executor(w, "labels", samples, memory_limit=10 ** 9, configurations=configurations)
+    assert best["num_workers"] in [1, 2]
+    assert [m["seconds_per_input"] is None for m in best["measurements"]] == [False, False, False, True]
+
+    workflow_filename = str(tmp_path / "segmentation.yaml")
+    save_workflow(workflow_filename, w)
+    save_executor_config(workflow_filename, best)
+    assert (tmp_path / "segmentation.executor.json").exists()
+
+    config = load_executor_config(workflow_filename)
+    results = run_batch(w, "labels", samples, config=config)
+    assert len(results) == 4
+    assert np.all(results[3] == label(gaussian(samples[3], sigma=1)))
+    assert load_executor_config(str(tmp_path / "other.yaml")) is None
+
+    # the saved configuration is found next to the workflow file
+    best["executor"] = "processes"
+    save_executor_config(workflow_filename, best)
+    loaded = load_workflow(workflow_filename)
+    assert len(run_batch(loaded, "labels", samples[:2])) == 2
+    assert "'executor': 'processes'" in generate_batch_script(loaded)
+    assert "'executor': 'threads'" in generate_batch_script(w, workflow_filename=str(tmp_path / "other.yaml"))
@@ -0,0 +1,42 @@
+import pytest
+
+
+def test_zarr_sink(tmp_path):
+    pytest.importorskip("zarr")
+    from napari_workflows import Workflow, ZarrSink
+    from skimage.filters import gaussian
+    from skimage.measure import label
+    import numpy as np
+
+    def threshold(image):
+        return image > 0.5
+
+    w = Workflow()
+    w.set("input", np.random.random((3, 20, 30)))
+    w.set("blurred", gaussian, "input", sigma=1)
+    w.set("binary", threshold, "blurred")
+    w.set("labels", label, "binary")
+
+    sink = ZarrSink(str(tmp_path / "results.zarr"), chunks=(1, 10, 10))
+    arrays = sink.write(w, ["blurred", "labels"])
+    assert arrays["labels"].chunks == (1, 10, 10)
+    assert np.all(sink.open("labels")[:] == w.get("labels"))
+    assert np.allclose(sink.open("blurred")[:], w.get("blurred"))
+
+    # e.g. one entry per processed time point
+    ome_sink = ZarrSink(str(tmp_path / "timelapse.ome.zarr"), ome_zarr=True)
+    for t in range(2):
+        w.set("input", np.random.random((3, 20, 30)))
+        assert ome_sink.append(w, "labels") == {"labels": t}
+        assert np.all(ome_sink.open("labels")[t] == w.get("labels"))
+    assert ome_sink.open("labels").shape == (2, 3, 20, 30)
+
+    import zarr
+    multiscales = zarr.open_group(str(tmp_path / "timelapse.ome.zarr" / "labels"), mode="r").attrs["multiscales"]
+    assert [a["name"] for a in multiscales[0]["axes"]] == ["t", "z", "y", "x"]
+
+    # appended 2D results are a time-lapse of planes
+    w.set("input", np.random.random((20, 30)))
+    ome_sink.append(w, "blurred")
+    multiscales = zarr.open_group(str(tmp_path / "timelapse.ome.zarr" / "blurred"), mode="r").attrs["multiscales"]
+    assert [a["name"] for a in multiscales[0]["axes"]] == ["t", "y", "x"]
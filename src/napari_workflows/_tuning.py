@@ -0,0 +1,197 @@
+import json
+import os
+import time
+from ._workflow import Workflow, _topological_order
+
+# executor configuration used if none was calibrated, also by generated batch scripts
+DEFAULT_EXECUTOR_CONFIG = {"executor": "threads", "num_workers": None, "chunksize": 1}
+
+
+def run_batch(workflow: Workflow, name: str, inputs, input_name: str = None, config: dict = None,
+              workflow_filename: str = None):
+    """
+    Computes a task of a workflow for many input images in parallel, e.g. with a
+    configuration determined using `calibrate_executor`. By default, the configuration
+    saved next to the workflow file is used, see `save_executor_config`.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    name: str
+        name of the task to compute
+    inputs: list of ndarray
+    input_name: str, optional
+        name of the input image in the workflow; by default its first root
+    config: dict, optional
+        "executor" ("threads" or "processes"), "num_workers" and "chunksize", the number
+        of inputs handed over to a worker at once
+    workflow_filename: str, optional
+        workflow file next to which the configuration was saved; by default the file the
+        workflow was loaded from or saved to
+
+    Returns
+    -------
+    list
+        one result per input
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    config = resolve_executor_config(workflow, config, workflow_filename)
+    input_name = _input_name(workflow, input_name)
+    inputs = list(inputs)
+
+    chunksize = max(1, int(config["chunksize"]))
+    chunks = [inputs[i:i + chunksize] for i in range(0, len(inputs), chunksize)]
+    if config["executor"] == "threads":
+        pool = ThreadPoolExecutor(max_workers=config["num_workers"])
+    elif config["executor"] == "processes":
+        pool = ProcessPoolExecutor(max_workers=config["num_workers"])
+    else:
+        raise ValueError("Unknown executor " + str(config["executor"]) + ", use 'threads' or 'processes'")
+
+    with pool:
+        chunk_results = list(pool.map(_process_chunk, [workflow] * len(chunks), [name] * len(chunks),
+                                      [input_name] * len(chunks), chunks))
+    return [result for results in chunk_results for result in results]
+
+
+def _process_chunk(workflow, name, input_name, inputs):
+    # the pool runs inputs in parallel already; also, thread pools of dask don't survive
+    # forking worker processes
+    from dask.local import get_sync
+    results = []
+    for image in inputs:
+        tasks = dict(workflow._tasks)
+        tasks[input_name] = image
+        results.append(get_sync(tasks, name))
+    return results
+
+
+def calibrate_executor(workflow: Workflow, name: str, sample_inputs, input_name: str = None,
+                       memory_limit: int = None, configurations=None):
+    """
+    Runs a workflow on sample inputs with several executor configurations and returns the
+    fastest one whose estimated memory consumption stays within a limit. Memory is
+    estimated from the peak memory of processing a single input, measured using tracemalloc.
+
+    Parameters
+    ----------
+    workflow: Workflow
+    name: str
+        name of the task to compute
+    sample_inputs: list of ndarray
+        representative inputs, e.g. a few images of a folder to process
+    input_name: str, optional
+        name of the input image in the workflow; by default its first root
+    memory_limit: int, optional
+        maximum number of bytes all workers together may allocate
+    configurations: list of dict, optional
+        configurations to try, see `run_batch`. By default, threads and processes with
+        different numbers of workers and chunk sizes.
+
+    Returns
+    -------
+    dict
+        the fastest configuration with its measured "seconds_per_input" and
+        "estimated_memory", and all "measurements"
+    """
+    import tracemalloc
+
+    input_name = _input_name(workflow, input_name)
+    sample_inputs = list(sample_inputs)
+    if len(sample_inputs) == 0:
+        raise ValueError("Calibration needs at least one sample input")
+    if configurations is None:
+        configurations = _default_configurations(len(sample_inputs))
+
+    # memory necessary for processing one input; also imports modules and warms up caches
+    tracemalloc.start()
+    try:
+        result = _process_chunk(workflow, name, input_name, sample_inputs[:1])[0]
+        _, peak_per_input = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    output_bytes = int(getattr(result, "nbytes", 0))
+
+    measurements = []
+    for configuration in configurations:
+        configuration = dict(DEFAULT_EXECUTOR_CONFIG, **configuration)
+        num_workers = configuration["num_workers"] if configuration["num_workers"] is not None else os.cpu_count()
+        # every worker processes one input at a time and keeps the results of its chunk
+        estimated_memory = num_workers * (peak_per_input + (configuration["chunksize"] - 1) * output_bytes)
+
+        measurement = dict(configuration, estimated_memory=estimated_memory, seconds_per_input=None)
+        if memory_limit is None or estimated_memory <= memory_limit:
+            start_time = time.perf_counter()
+            run_batch(workflow, name, sample_inputs, input_name, configuration)
+            measurement["seconds_per_input"] = (time.perf_counter() - start_time) / len(sample_inputs)
+        measurements.append(measurement)
+
+    candidates = [m for m in measurements if m["seconds_per_input"] is not None]
+    if len(candidates) == 0:
+        raise ValueError("No configuration stays within the memory limit of " + str(memory_limit) + " bytes")
+    best = dict(min(candidates, key=lambda m: m["seconds_per_input"]))
+    best["measurements"] = measurements
+    return best
+
+
+def _default_configurations(num_inputs):
+    cpu_count = os.cpu_count() or 1
+    worker_counts = sorted(set([n for n in [1, 2, 4, 8, cpu_count] if n <= cpu_count]))
+    configurations = []
+    for executor in ["threads", "processes"]:
+        for num_workers in worker_counts:
+            for chunksize in [1, 2, 4]:
+                if chunksize == 1 or chunksize * num_workers <= num_inputs:
+                    configurations.append({"executor": executor, "num_workers": num_workers, "chunksize": chunksize})
+    return configurations
+
+
+def _input_name(workflow, input_name):
+    if input_name is not None:
+        return input_name
+    roots, _ = _topological_order(workflow._tasks)
+    if len(roots) == 0:
+        raise ValueError("The workflow has no input")
+    return roots[0]
+
+
+def resolve_executor_config(workflow: Workflow, config: dict = None, workflow_filename: str = None):
+    """
+    Returns a complete executor configuration: the given one, or the one saved next to the
+    workflow file, or the default configuration.
+    """
+    if config is None:
+        if workflow_filename is None:
+            workflow_filename = workflow.filename
+        if workflow_filename is not None:
+            config = load_executor_config(workflow_filename)
+    return dict(DEFAULT_EXECUTOR_CONFIG, **(config if config is not None else {}))
+
+
+def executor_config_filename(workflow_filename: str):
+    """
+    Returns the name of the file next to a workflow file where its executor configuration
+    is stored, e.g. "segmentation.executor.json" for "segmentation.yaml".
+    """
+    return os.path.splitext(workflow_filename)[0] + ".executor.json"
+
+
+def save_executor_config(workflow_filename: str, config: dict):
+    """
+    Stores an executor configuration, e.g. as returned by `calibrate_executor`, next to a
+    workflow file.
+    """
+    with open(executor_config_filename(workflow_filename), "w") as stream:
+        json.dump(config, stream, indent=2)
+
+
+def load_executor_config(workflow_filename: str):
+    """
+    Returns the executor configuration stored next to a workflow file, or None.
+    """
+    filename = executor_config_filename(workflow_filename)
+    if not os.path.exists(filename):
+        return None
+    with open(filename) as stream:
+        return json.load(stream)
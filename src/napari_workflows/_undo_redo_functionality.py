@@ -2,7 +2,7 @@
 # https://github.com/ArjanCodes/2021-command-undo-redo/blob/main/LICENSE
 # TODO mention it in case of implementation (MIT LICENSE)
 from dataclasses import dataclass, field
-from typing import List, Callable
+from typing import List, Callable, Optional
 
 import warnings
 from ._workflow import Workflow, _layer_name_or_value
@@ -26,12 +26,17 @@ class UndoRedoController:
     freeze_stacks: bool
         Actions can be performed on the workflow but undo and redo stacks
         remain unchanged when freeze_stacks = True
+
+    restore: Callable
+        Optional function receiving the workflow state returned by undo() and redo(),
+        e.g. for applying it to the workflow and restoring cached results
     """
     workflow: Workflow
     viewer: Viewer
     undo_stack: List[Workflow] = field(default_factory = list)
     redo_stack: List[Workflow] = field(default_factory = list)
     freeze_stacks: bool = False
+    restore: Optional[Callable] = None
 
     def execute(self, action: Callable) -> None:
         """
@@ -94,6 +99,8 @@ class UndoRedoController:
             self.redo_stack.append(
                 copy_workflow_state(self.workflow)
             )
+        if self.restore is not None:
+            self.restore(undone_workflow)
         return undone_workflow
 
     def redo(self) -> Workflow:
@@ -108,6 +115,8 @@ class UndoRedoController:
             self.undo_stack.append(
                 copy_workflow_state(self.workflow)
             )
+        if self.restore is not None:
+            self.restore(redone_workflow)
         return redone_workflow
 
 
@@ -117,8 +126,6 @@ def copy_workflow_state(workflow: Workflow) -> Workflow:
     including any input images
     """
     workflow_state = Workflow()
-    for key, value in workflow._tasks.items():
-        if callable(value[0]): 
-            workflow_state.set(key, value)
+    workflow_state.set_many({key: value for key, value in workflow._tasks.items() if callable(value[0])})
 
     return workflow_state
@@ -1,7 +1,11 @@
 import numpy as np
 import inspect
+import os
+import threading
 import time
-from functools import partial
+import weakref
+from functools import partial, lru_cache
+from types import MappingProxyType
 
 METADATA_WORKFLOW_VALID_KEY = "workflow_valid"
 
@@ -15,11 +19,89 @@ class Workflow():
     that might be listed in the dictionary. When retrieving an image result using
     `get(task_name)`, all tasks are executed recursively that are necessary to retrieve
     the result of the specified task.
+
+    Workflows can be read and modified from multiple threads. The task dictionary is never
+    modified in place; every modification replaces it with a modified copy (copy-on-write).
+    Readers work on the dictionary that was current when they started and never wait for
+    writers or computations. Hence, `_tasks` is a read-only view of the current dictionary;
+    assigning a new dictionary to it replaces all tasks.
     """
 
     def __init__(self):
         # We start with an empty workflow with no tasks
-        self._tasks = {}
+        self._task_dict = {}
+        self._init_runtime_state()
+
+    @property
+    def _tasks(self):
+        return MappingProxyType(self._task_dict)
+
+    @_tasks.setter
+    def _tasks(self, tasks):
+        tasks = dict(tasks)
+
+        def replace(current):
+            current.clear()
+            current.update(tasks)
+        self._modify(replace)
+
+    def _init_runtime_state(self):
+        # serializes writers; readers don't need it
+        self._write_lock = threading.Lock()
+        # (task dictionary, dictionary name -> followers) computed on demand
+        self._followers_index = None
+        # optional Instrumentation receiving events and metrics
+        self.instrumentation = None
+        # file the workflow was loaded from or saved to, e.g. for finding its executor configuration
+        self.filename = None
+
+    def __getstate__(self):
+        # only the tasks are saved, e.g. to yaml files
+        return {"_tasks": self._task_dict}
+
+    def __setstate__(self, state):
+        self._task_dict = dict(state["_tasks"])
+        self._init_runtime_state()
+
+    def _modify(self, modification):
+        """
+        Replaces the task dictionary by a modified copy.
+
+        Parameters
+        ----------
+        modification: callable
+            receives a copy of the task dictionary and modifies it in place
+        """
+        with self._write_lock:
+            tasks = dict(self._task_dict)
+            modification(tasks)
+            self._task_dict = tasks
+
+        instrumentation = self.instrumentation
+        if instrumentation is not None:
+            instrumentation.increment("workflow_modifications_total")
+            instrumentation.emit("workflow_modified", tasks=len(tasks))
+
+    def _followers(self):
+        """
+        Returns a dictionary image name -> names of images produced out of it, for the current tasks.
+        """
+        tasks = self._task_dict
+        index = self._followers_index
+        if index is not None and index[0] is tasks:
+            return index[1]
+
+        followers = {}
+        for result, task in tasks.items():
+            if isinstance(task, tuple):
+                for source in task:
+                    if isinstance(source, str):
+                        if source not in followers.keys():
+                            followers[source] = []
+                        if result not in followers[source]:
+                            followers[source].append(result)
+        self._followers_index = (tasks, followers)
+        return followers
 
     def set(self, name, func_or_data, *args, **kwargs):
         """
@@ -37,18 +119,14 @@ class Workflow():
         """
         # If it's not a function, just store the data
         if not callable(func_or_data):
-            self._tasks[name] = func_or_data
+            self.set_task(name, func_or_data)
             return
 
         # determine defaul parameters and apply them
-        sig = inspect.signature(func_or_data)
+        used_args = _bind_arguments(func_or_data, args, kwargs)
 
-        bound = sig.bind(*args, **kwargs)
-        bound.apply_defaults()
         # Go through arguments and in case it's a callable, remove it
         # We should only have numbers, strings and images as parameters
-        used_args = [value for key, value in bound.arguments.items()]
-
         for i in range(len(used_args)):
             if callable(used_args[i]):
                 used_args[i] = None
@@ -57,8 +135,15 @@ class Workflow():
         while (used_args[-1] is None):
             used_args = used_args[:-1]
 
+        task = tuple([func_or_data] + used_args)
+
+        # e.g. re-setting the same parameters while dragging a slider: no need to update the graph
+        previous = self._tasks.get(name)
+        if isinstance(previous, tuple) and _same_task(previous, task):
+            return
+
         # Store the task
-        self._tasks[name] = tuple([func_or_data] + used_args)
+        self.set_task(name, task)
 
     def remove(self, name):
         """
@@ -70,14 +155,24 @@ class Workflow():
             name of the taks to be removed, typically corresponds to the layer name
         """
         if name in self._tasks.keys():
-            self._tasks.pop(name)
+            self._modify(lambda tasks: tasks.pop(name, None))
 
     def get(self, name):
         """
         Execute a task and all tasks that are necessary to retrieve the result.
         """
         from dask.threaded import get as dask_get
-        return dask_get(self._tasks, name)
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return dask_get(self._task_dict, name)
+
+        start_time = time.perf_counter()
+        result = dask_get(self._task_dict, name)
+        duration = time.perf_counter() - start_time
+        instrumentation.increment("workflow_get_total")
+        instrumentation.observe("workflow_get_seconds", duration)
+        instrumentation.emit("workflow_get", name=name, seconds=duration)
+        return result
 
     def get_task(self, name):
         """
@@ -89,7 +184,20 @@ class Workflow():
         """
         Replaces a given task.
         """
-        self._tasks[name] = task
+        def replace(tasks):
+            tasks[name] = task
+        self._modify(replace)
+
+    def set_many(self, tasks: dict):
+        """
+        Adds or replaces several tasks at once, which is faster than setting them one by one.
+
+        Parameters
+        ----------
+        tasks: dict
+            name -> task tuple or data, as handed over to `set_task`
+        """
+        self._modify(lambda current: current.update(tasks))
 
     def remove_all_except(self, names):
         """
@@ -99,9 +207,11 @@ class Workflow():
         ----------
         names: list or tuple of str
         """
-        to_remove = [k for k in self._tasks.keys() if k not in names]
-        for r in to_remove:
-            del self._tasks[r]
+        def remove_others(tasks):
+            to_remove = [k for k in tasks.keys() if k not in names]
+            for r in to_remove:
+                del tasks[r]
+        self._modify(remove_others)
 
     def roots(self):
         """
@@ -109,9 +219,10 @@ class Workflow():
         """
         origins = []
 
-        keys_with_functions = [key for key, task in self._tasks.items() if callable(task[0])]
+        tasks = self._tasks
+        keys_with_functions = [key for key, task in tasks.items() if callable(task[0])]
 
-        for result, task in self._tasks.items():
+        for result, task in tasks.items():
             for source in task:
                 if isinstance(source, str):
                     if not source in keys_with_functions:
@@ -123,35 +234,50 @@ class Workflow():
         """
         Return all names of images that are produced out of a given image.
         """
-        followers = []
-        for result, task in self._tasks.items():
-            for source in task:
-                if isinstance(source, str):
-                    if source == item:
-                        if result not in followers:
-                            followers.append(result)
-        return followers
+        return list(self._followers().get(item, []))
 
     def sources_of(self, item):
         """
         Returns all names of images that need to be there to produce a given image.
         """
-        if item not in self._tasks.keys():
+        task = self._tasks.get(item)
+        if not isinstance(task, tuple):
             return []
-        task = self._tasks[item]
         return [i for i in task if isinstance(i, str)]
 
     def leafs(self):
         """
         Returns all image names that have no further processing steps.
         """
-        return [l for l in self._tasks.keys() if len(self.followers_of(l)) == 0]
+        followers = self._followers()
+        return [l for l in self._tasks.keys() if len(followers.get(l, [])) == 0]
+
+    def analyze(self, costs: dict = None, output_sizes: dict = None):
+        """
+        Analyzes the graph of the workflow, e.g. its critical path and how many steps can run
+        in parallel, and estimates duration, peak memory and speedup for a number of workers.
+        Measured costs and output sizes can be retrieved using `measure_costs`.
+
+        Parameters
+        ----------
+        costs: dict, optional
+            task name -> duration of the step; by default every step counts as 1
+        output_sizes: dict, optional
+            name -> number of bytes of the result
+
+        Returns
+        -------
+        WorkflowAnalysis
+        """
+        from ._analysis import WorkflowAnalysis
+        return WorkflowAnalysis(self, costs, output_sizes)
 
     def clear(self):
         """
         Removes all workflow steps stored in self._tasks
         """
-        self._tasks = {}
+        with self._write_lock:
+            self._task_dict = {}
 
     def __str__(self):
         out = "Workflow:\n"
@@ -194,14 +320,53 @@ class WorkflowManager():
         viewer: "napari.Viewer"
         """
         from napari._qt.qthreading import thread_worker
+        from ._instrumentation import Instrumentation
+        from ._result_cache import ResultCache
 
         self.viewer = viewer
         self.workflow: Workflow = Workflow()
-        self.undo_redo_controller = UndoRedoController(self.workflow, viewer)
+        # counters, histograms and events, e.g. for monitoring long-running sessions
+        self.instrumentation = Instrumentation()
+        self.workflow.instrumentation = self.instrumentation
+        self.undo_redo_controller = UndoRedoController(self.workflow, viewer, restore=self._restore_workflow_state)
         self._register_events_to_viewer(viewer)
         self.worker = None
         self._is_active = True
 
+        # layer name -> region of its inputs that changed, for layers that can be recomputed partially
+        self._dirty_regions = {}
+        # layer name -> recomputed data which was not sent to the viewer yet; its followers
+        # were invalidated already
+        self._pending_results = {}
+
+        # In lazy mode, invalid layers are replaced by lazily evaluated arrays, which compute
+        # only what's necessary for showing the current plane. The complete results are
+        # computed in the background afterwards.
+        self.lazy_update = False
+        # layer name -> lazy array that should be computed completely
+        self._background_results = {}
+
+        # results of former parameter sets, e.g. for restoring them on undo without recomputing
+        self.result_cache = ResultCache()
+        # names of layers whose parameters were restored on undo / redo; their widgets still
+        # show the newer parameters
+        self._restored_layers = set()
+        # layer name -> fingerprint of the task whose result is being computed
+        self._computing_fingerprints = {}
+        # input layer name -> (data, content hash)
+        self._root_hashes = {}
+        # computed layer name -> (data, token) of results modified in place, e.g. by painting
+        self._edited_layers = {}
+        # optional SharedResultStore, e.g. a directory shared by the napari sessions on a workstation
+        self.shared_store = None
+        if os.environ.get("NAPARI_WORKFLOWS_SHARED_STORE") is not None:
+            from ._shared_store import SharedResultStore
+            self.shared_store = SharedResultStore(os.environ["NAPARI_WORKFLOWS_SHARED_STORE"])
+        # seconds to wait for a result another session is computing before computing it here
+        self.shared_store_wait = 5
+        # layer name -> (fingerprint, time) of results found being computed by another session
+        self._claimed_elsewhere = {}
+
         # The thread worker will run in the background and check if images have to be recomputed.
         @thread_worker
         def loop_run():
@@ -219,6 +384,8 @@ class WorkflowManager():
                     name, data = whatever
                     if _viewer_has_layer(self.viewer, name):
                         self.viewer.layers[name].data = data
+                    else:
+                        self._record_dropped_update(name, "layer removed")
 
             # Start the loop
             self.worker.yielded.connect(update_layer)
@@ -247,11 +414,57 @@ class WorkflowManager():
         items: list or tuple of str
             List of layer names to be invalidated
         """
+        count, depth = self._invalidate(items)
+        if count > 0:
+            self.instrumentation.increment("invalidated_layers_total", count)
+            self.instrumentation.observe("invalidation_depth", depth, buckets=(1, 2, 3, 5, 10, 20, 50, 100))
+            self.instrumentation.emit("invalidated", layers=count, depth=depth)
+
+    def _invalidate(self, items):
+        """
+        Invalidates layers and their followers recursively.
+
+        Returns
+        -------
+        tuple(int, int)
+            number of invalidated layers and depth of the cascade
+        """
+        count = 0
+        depth = 0
         for f in items:
             if _viewer_has_layer(self.viewer, f):
                 layer = self.viewer.layers[f]
                 layer.metadata[METADATA_WORKFLOW_VALID_KEY] = False
-                self.invalidate(self.workflow.followers_of(f))
+                # the whole layer has to be recomputed
+                self._dirty_regions.pop(f, None)
+                follower_count, follower_depth = self._invalidate(self.workflow.followers_of(f))
+                count = count + 1 + follower_count
+                depth = max(depth, 1 + follower_depth)
+        return count, depth
+
+    def invalidate_region(self, name, region):
+        """
+        Invalidates the layers produced out of a given layer after its data was modified in a
+        region only, e.g. by painting. Layers whose functions declare a spatial footprint (see
+        `spatial_footprint`) will only be recomputed in that region, dilated by the footprint,
+        all others completely.
+
+        Parameters
+        ----------
+        name: str
+            name of the modified layer
+        region: tuple of (int, int)
+            start and stop of the modified region per axis
+        """
+        from ._regions import union_regions
+        for f in self.workflow.followers_of(name):
+            if _viewer_has_layer(self.viewer, f):
+                layer = self.viewer.layers[f]
+                if _layer_invalid(layer) and f not in self._dirty_regions.keys():
+                    # it will be recomputed completely anyway
+                    continue
+                self._dirty_regions[f] = union_regions(self._dirty_regions.get(f, region), region)
+                layer.metadata[METADATA_WORKFLOW_VALID_KEY] = False
 
     def update(self, target_layer, function, *args, **kwargs):
         """
@@ -278,12 +491,16 @@ class WorkflowManager():
                     # Workaround: If we don't stop storing this here, it crashes later
                     # because it passes strings as images to image processing functions
                     print("Finding layer failed. Change was not stored")
+                    self._record_dropped_update(target_layer.name, "layer not found")
                     return
         if isinstance(args[-1], Viewer):
             args = args[:-1]
         args = tuple(args)
 
         self.undo_redo_controller.execute(partial(self._update_workflow_step, target_layer, function, args, kwargs))
+        self._restored_layers.discard(target_layer.name)
+        self.instrumentation.increment("workflow_updates_total")
+        self.instrumentation.emit("workflow_step_updated", layer=target_layer.name)
 
         # set result valid
         target_layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
@@ -308,30 +525,399 @@ class WorkflowManager():
         layer_names = [layer.name for layer in self.viewer.layers]
         self.workflow.remove_all_except(layer_names)
 
-    def to_python_code(self, notebook=False, use_napari:bool=True):
+    def to_python_code(self, notebook=False, use_napari:bool=True, format_code:bool=True):
         """
         Output the current workflow in the viewer as python code.
 
+        Parameters
+        ----------
+        notebook: bool, optional
+            In case code is generated for jupyter notebooks, it looks a bit different.
+        use_napari: bool, optional
+            Add code that shows the results in napari
+        format_code: bool, optional
+            Format the code PEP8 compliant using autopep8. Can be turned off to speed up
+            code generation for large workflows.
+
+        Returns
+        -------
+        str: python code
+        """
+        return _generate_python_code(self.workflow, self.viewer, notebook=notebook, use_napari=use_napari, format_code=format_code)
+
+    def to_batch_script(self, outputs=None, workflow_filename: str = None):
+        """
+        Output the current workflow in the viewer as standalone python script that processes
+        folders of images or timelapse datasets in parallel without napari.
+
+        Parameters
+        ----------
+        outputs: list of str, optional
+            Names of the layers to save. By default, all leafs of the workflow are saved.
+        workflow_filename: str, optional
+            Workflow file next to which an executor configuration was saved using
+            `save_executor_config`.
+
         Returns
         -------
         str: python code
         """
-        return _generate_python_code(self.workflow, self.viewer, notebook=notebook, use_napari=use_napari)
+        from ._batch_script import generate_batch_script
+        image_names = [layer.name for layer in self.viewer.layers]
+        return generate_batch_script(self.workflow, outputs=outputs, image_names=image_names,
+                                     workflow_filename=workflow_filename)
 
     def _update_invalid_layer(self):
         """
         Searches for the next layer that should be updated because it's invalid.
         """
-        layer = self._search_first_invalid_layer(self.workflow.roots())
+        layer = self._search_first_invalid_layer(self.workflow.roots(), skip=self._waiting_for_other_sessions())
         if layer is None:
-            return
+            return self._compute_background_result()
+        start_time = time.perf_counter()
+
+        fingerprint = self._result_fingerprints().get(layer.name)
+        cached = self.result_cache.get(fingerprint) if fingerprint is not None else None
+        if cached is not None:
+            return self._cached_update(layer, cached, "cache", start_time)
+        if fingerprint is not None and self.shared_store is not None:
+            shared = self.shared_store.get(fingerprint)
+            if shared is not None:
+                self.result_cache.put(fingerprint, shared)
+                return self._cached_update(layer, shared, "shared", start_time)
+            if not self.shared_store.claim(fingerprint):
+                _, noticed = self._claimed_elsewhere.setdefault(layer.name, (fingerprint, time.time()))
+                if time.time() - noticed < self.shared_store_wait:
+                    # another session is computing this result; update other layers meanwhile
+                    return None
+                # the other session takes too long; compute the result here as well
+        self._claimed_elsewhere.pop(layer.name, None)
+        if fingerprint is not None:
+            self._computing_fingerprints[layer.name] = fingerprint
+
+        if layer.name in self._dirty_regions.keys():
+            patched = self._recompute_dirty_region(layer, self._dirty_regions.pop(layer.name))
+            if patched is not None:
+                self._record_update(layer.name, "region", start_time)
+                return patched
+        if self.lazy_update:
+            lazy = self._lazy_layer_data(layer)
+            if lazy is not None:
+                self._record_update(layer.name, "lazy", start_time)
+                return lazy
+        if layer.name in self._restored_layers:
+            # the widget would compute the result with its own, newer parameters
+            return self._compute_restored_layer(layer, start_time)
         try:
-            self.viewer.layers[layer.name].source.widget()
+            self._run_widget(layer)
             layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+            self._record_update(layer.name, "full", start_time)
+        except Exception as a:
+            print("Error while updating", layer.name, a)
+            self._release_fingerprint(layer.name)
+            self._record_update_error(layer.name, a)
+
+    def _run_widget(self, layer):
+        """
+        Recomputes a layer by running the widget that produced it, which updates the layer.
+        """
+        self.viewer.layers[layer.name].source.widget()
+
+    def _compute_restored_layer(self, layer, start_time):
+        """
+        Computes a layer using the parameters stored in the workflow, e.g. after undo.
+
+        Returns
+        -------
+        tuple(str, ndarray) or None
+            layer name and computed data, or None if computing failed
+        """
+        try:
+            task = self.workflow.get_task(layer.name)
+            arguments = [self._layer_data_or_value(a) for a in task[1:]]
+            current_timepoint = self.viewer.dims.current_step[0]
+            for i, value in enumerate(arguments):
+                if is_image(value) and len(value.shape) == 4:
+                    # only the current time point is processed, as by the widgets
+                    value = value[current_timepoint]
+                    arguments[i] = value[0] if value.shape[0] == 1 else value
+            data = task[0](*arguments)
+        except Exception as a:
+            print("Error while updating", layer.name, a)
+            self._release_fingerprint(layer.name)
+            self._record_update_error(layer.name, a)
+            return None
+        self._restored_layers.discard(layer.name)
+        layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+        # the followers were invalidated already
+        self._pending_results[layer.name] = data
+        self._record_update(layer.name, "restored", start_time)
+        return layer.name, data
+
+    def _waiting_for_other_sessions(self):
+        """
+        Returns the names of layers whose results other sessions are computing, and of all
+        layers depending on them, until the results were stored or waiting timed out.
+        """
+        waiting = set()
+        now = time.time()
+        for name, (fingerprint, noticed) in list(self._claimed_elsewhere.items()):
+            if now - noticed < self.shared_store_wait and fingerprint not in self.shared_store:
+                waiting.add(name)
+        pending = list(waiting)
+        while len(pending) > 0:
+            for follower in self.workflow.followers_of(pending.pop()):
+                if follower not in waiting:
+                    waiting.add(follower)
+                    pending.append(follower)
+        return waiting
+
+    def _cached_update(self, layer, data, mode, start_time):
+        """
+        Marks a layer as valid and returns a cached result for it.
+        """
+        self._claimed_elsewhere.pop(layer.name, None)
+        self._restored_layers.discard(layer.name)
+        self._dirty_regions.pop(layer.name, None)
+        layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+        self._pending_results[layer.name] = data
+        # the followers may be invalid for a region only, or valid for former data
+        self.invalidate(self.workflow.followers_of(layer.name))
+        self._record_update(layer.name, mode, start_time)
+        return layer.name, data
+
+    def _release_fingerprint(self, name):
+        """
+        Forgets the fingerprint of a result that was being computed and returns it.
+        """
+        fingerprint = self._computing_fingerprints.pop(name, None)
+        if fingerprint is not None and self.shared_store is not None:
+            self.shared_store.release(fingerprint)
+        return fingerprint
+
+    def _result_fingerprints(self):
+        """
+        Returns the fingerprints of all steps of the workflow, identifying input layers
+        by their content. Returns an empty dictionary if the content of an input layer
+        cannot be hashed cheaply, e.g. for lazily loaded data. Computed layers that were
+        modified in place are identified by their modifications.
+        """
+        from ._fingerprint import task_fingerprints, content_hash
+        roots, _ = _topological_order(self.workflow._tasks)
+        root_tokens = {}
+        for name in roots:
+            if not _viewer_has_layer(self.viewer, name):
+                continue
+            data = self.viewer.layers[name].data
+            if not isinstance(data, np.ndarray):
+                return {}
+            known = self._root_hashes.get(name)
+            if known is None or known[0] is not data:
+                known = (data, content_hash(data))
+                self._root_hashes[name] = known
+            root_tokens[name] = "layer:" + known[1]
+            if data.ndim == 4:
+                # only the current time point is processed
+                root_tokens[name] = root_tokens[name] + "@" + str(self.viewer.dims.current_step[0])
+
+        result_tokens = {}
+        for name, (data, token) in list(self._edited_layers.items()):
+            if _viewer_has_layer(self.viewer, name) and self.viewer.layers[name].data is data and \
+                    not _layer_invalid(self.viewer.layers[name]):
+                result_tokens[name] = token
+            else:
+                # recomputed or about to be recomputed, which discards the modifications
+                del self._edited_layers[name]
+        return task_fingerprints(self.workflow, root_tokens=root_tokens, result_tokens=result_tokens)
+
+    def _restore_workflow_state(self, state: Workflow):
+        """
+        Replaces the steps of the workflow by those of a former state, e.g. on undo. Layers
+        whose results for these parameters are still in the result cache are restored
+        immediately; the others are invalidated and recomputed using the restored parameters.
+        """
+        tasks = {k: v for k, v in state._tasks.items() if _is_task(v)}
+        current = self.workflow._tasks
+        changed = [k for k, v in tasks.items() if not (_is_task(current.get(k)) and _same_task(current[k], v))]
+
+        def restore(current_tasks):
+            for key in [k for k, v in current_tasks.items() if _is_task(v) and k not in tasks.keys()]:
+                del current_tasks[key]
+            current_tasks.update(tasks)
+        self.workflow._modify(restore)
+        self._restored_layers.update(changed)
+        self.invalidate(changed)
+
+        fingerprints = self._result_fingerprints()
+        _, order = _topological_order(self.workflow._tasks)
+        for name in order:
+            if not _viewer_has_layer(self.viewer, name) or not _layer_invalid(self.viewer.layers[name]):
+                continue
+            start_time = time.perf_counter()
+            cached = self.result_cache.get(fingerprints.get(name))
+            if cached is None and self.shared_store is not None and name in fingerprints.keys():
+                cached = self.shared_store.get(fingerprints[name])
+            if cached is not None:
+                self._restored_layers.discard(name)
+                self._dirty_regions.pop(name, None)
+                # the followers were invalidated already
+                self._pending_results[name] = cached
+                self.viewer.layers[name].data = cached
+                self._record_update(name, "cache", start_time)
+
+    def _record_update(self, name, mode, start_time):
+        duration = time.perf_counter() - start_time
+        if mode in ("cache", "shared"):
+            # restored, not computed
+            self.instrumentation.increment("cache_hits_total")
+        else:
+            self.instrumentation.increment("recomputations_total")
+        self.instrumentation.observe("update_seconds", duration)
+        self.instrumentation.emit("layer_updated", layer=name, mode=mode, seconds=duration)
+
+    def _record_update_error(self, name, error):
+        self.instrumentation.increment("update_errors_total")
+        self.instrumentation.emit("update_failed", layer=name, error=str(error))
+
+    def _record_dropped_update(self, name, reason):
+        self.instrumentation.increment("dropped_updates_total")
+        self.instrumentation.emit("update_dropped", layer=name, reason=reason)
+
+    def _recompute_dirty_region(self, layer, input_region):
+        """
+        Recomputes a layer only in the region affected by changes of its inputs.
+
+        Returns
+        -------
+        tuple(str, ndarray) or None
+            layer name and patched data, or None if the layer must be recomputed completely
+        """
+        from ._regions import get_footprint, dilate_region, recompute_region
+        try:
+            task = self.workflow.get_task(layer.name)
+        except KeyError:
+            return None
+        function = task[0]
+        previous = layer.data
+        if not callable(function) or not is_image(previous) or len(input_region) != len(previous.shape):
+            return None
+
+        arguments = [self._layer_data_or_value(a) for a in task[1:]]
+        radius = get_footprint(function, arguments, len(previous.shape))
+        if radius is None:
+            return None
+        region = dilate_region(input_region, radius, previous.shape)
+        try:
+            data = recompute_region(function, arguments, region, previous)
+        except ValueError:
+            return None
+
+        layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+        self._pending_results[layer.name] = data
+        self.invalidate_region(layer.name, region)
+        return layer.name, data
+
+    def _lazy_layer_data(self, layer):
+        """
+        Replaces the data of an invalid layer by a lazily evaluated array.
+
+        Returns
+        -------
+        tuple(str, dask.array.Array) or None
+            layer name and lazy data, or None if the layer cannot be computed lazily
+        """
+        from ._lazy import lazy_result
+        try:
+            task = self.workflow.get_task(layer.name)
+        except KeyError:
+            return None
+        if not _is_task(task):
+            return None
+
+        inputs, hints = self._lazy_inputs(exclude=layer.name)
+        try:
+            data = lazy_result(self.workflow, layer.name, inputs=inputs, hints=hints)
         except Exception as a:
             print("Error while updating", layer.name, a)
+            self._record_update_error(layer.name, a)
+            return None
+
+        layer.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+        self._pending_results[layer.name] = data
+        self._background_results[layer.name] = data
+        return layer.name, data
 
-    def _search_first_invalid_layer(self, items):
+    def _lazy_inputs(self, exclude=None):
+        """
+        Returns the data of layers that are up-to-date and don't need to be recomputed,
+        except the given one, and hints on the shape and type of all layers, see
+        `lazy_result`. Time-lapse data is reduced to the current time point, as when
+        updating layers completely.
+        """
+        current_timepoint = self.viewer.dims.current_step[0]
+        inputs = {}
+        hints = {}
+        for other in self.viewer.layers:
+            if not is_image(other.data):
+                continue
+            data = self._layer_data_or_value(other.name)
+            if len(data.shape) == 4:
+                data = data[current_timepoint]
+                if data.shape[0] == 1:
+                    data = data[0]
+            hints[other.name] = data
+            if not _layer_invalid(other) and other.name != exclude:
+                inputs[other.name] = data
+        return inputs, hints
+
+    def _compute_background_result(self):
+        """
+        Computes the complete result of a layer that was updated lazily before. Layers are
+        computed in execution order and the lazy results of their followers are rebuilt on
+        the computed data, so that intermediate results are computed once only.
+
+        Returns
+        -------
+        tuple(str, ndarray) or None
+            layer name and computed data, or None if there is nothing to compute
+        """
+        from ._lazy import lazy_result
+        _, order = _topological_order(self.workflow._tasks)
+        names = [n for n in order if n in self._background_results.keys()] + \
+                [n for n in self._background_results.keys() if n not in order]
+        for name in names:
+            self._background_results.pop(name)
+            if not _viewer_has_layer(self.viewer, name) or _layer_invalid(self.viewer.layers[name]):
+                continue
+            start_time = time.perf_counter()
+            try:
+                inputs, hints = self._lazy_inputs(exclude=name)
+                data = np.asarray(lazy_result(self.workflow, name, inputs=inputs, hints=hints).compute())
+            except Exception as a:
+                print("Error while updating", name, a)
+                self._record_update_error(name, a)
+                continue
+            if name in self._background_results.keys() or _layer_invalid(self.viewer.layers[name]):
+                # the layer was changed in the meantime
+                self._record_dropped_update(name, "outdated")
+                continue
+            self._pending_results[name] = data
+            self._record_update(name, "background", start_time)
+            return name, data
+        return None
+
+    def _layer_data_or_value(self, value):
+        """
+        Returns the data of the layer with the given name, or the value itself if it is not a layer name.
+        """
+        if isinstance(value, str):
+            if value in self._pending_results.keys():
+                return self._pending_results[value]
+            if _viewer_has_layer(self.viewer, value):
+                return self.viewer.layers[value].data
+        return value
+
+    def _search_first_invalid_layer(self, items, skip=()):
         """
         Recursively searches for the next layer that sould be udpated in the graph of tasks.
 
@@ -339,18 +925,21 @@ class WorkflowManager():
         ----------
         items: list[str]
             List of task names; typically starts at roots().
+        skip: set of str, optional
+            Names of layers that shouldn't be updated now
 
         Returns
         -------
         str: task/layer name that should be updated
         """
+        items = [i for i in items if i not in skip]
         for i in items:
             if _viewer_has_layer(self.viewer, i):
                 layer = self.viewer.layers[i]
                 if _layer_invalid(layer):
                     return layer
         for i in items:
-            invalid_follower = self._search_first_invalid_layer(self.workflow.followers_of(i))
+            invalid_follower = self._search_first_invalid_layer(self.workflow.followers_of(i), skip)
             if invalid_follower is not None:
                 return invalid_follower
 
@@ -373,15 +962,64 @@ class WorkflowManager():
         its data is updated.
         """
         layer.events.data.connect(self._layer_data_updated)
+        if hasattr(layer.events, "paint"):
+            layer.events.paint.connect(self._layer_painted)
 
     def _layer_data_updated(self, event):
         #print("Layer data updated", event.source, type(event.source))
         event.source.metadata[METADATA_WORKFLOW_VALID_KEY] = True
+        data = event.source.data
+        if isinstance(data, np.ndarray) and str(event.source) in self._computing_fingerprints.keys():
+            fingerprint = self._computing_fingerprints[str(event.source)]
+            self.result_cache.put(fingerprint, data)
+            if self.shared_store is not None:
+                self.shared_store.put(fingerprint, data)
+        self._release_fingerprint(str(event.source))
+        if self._pending_results.pop(str(event.source), None) is not None:
+            # a region was recomputed and its followers were invalidated for that region already
+            return
         for f in self.workflow.followers_of(str(event.source)):
             if _viewer_has_layer(self.viewer, f):
                 layer = self.viewer.layers[f]
                 self.invalidate(self.workflow.followers_of(f))
 
+    def _layer_painted(self, event):
+        """
+        Invalidates followers of a labels layer in the region that was painted.
+        """
+        from ._regions import painted_region
+        from ._fingerprint import content_hash, _hash
+        data = event.source.data
+        # the data was modified in place: cached results must not change with it
+        self.result_cache.discard_value(data)
+        try:
+            region = painted_region(event.value, data.shape)
+        except (TypeError, IndexError, ValueError, AttributeError):
+            region = None
+
+        name = str(event.source)
+        known = self._root_hashes.pop(name, None)
+        if region is not None and known is not None and known[0] is data:
+            # hashing the painted region only is much faster than hashing the whole image again
+            painted = data[tuple([slice(start, stop) for start, stop in region])]
+            painted_hash = _hash(known[1] + "|painted" + str(region) + ":" + content_hash(painted))
+            self._root_hashes[name] = (data, painted_hash)
+
+        if _is_task(self.workflow._tasks.get(name)) and isinstance(data, np.ndarray):
+            # a computed layer: its data doesn't match its task anymore
+            previous = self._result_fingerprints().get(name)
+            if previous is None or region is None:
+                token = "edited:" + content_hash(data)
+            else:
+                painted = data[tuple([slice(start, stop) for start, stop in region])]
+                token = previous + "|painted" + str(region) + ":" + content_hash(painted)
+            self._edited_layers[name] = (data, token)
+
+        if region is None:
+            self.invalidate(self.workflow.followers_of(str(event.source)))
+        else:
+            self.invalidate_region(str(event.source), region)
+
     def _layer_added(self, event):
         #print("Layer added", event.value, type(event.value))
         self._register_events_to_layer(event.value)
@@ -462,7 +1100,7 @@ def _get_layer_from_data(viewer: "napari.Viewer", data):
     return None
 
 
-def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook: bool = False, use_napari:bool = True):
+def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook: bool = False, use_napari:bool = True, format_code:bool = True):
     """
     Takes a Workflow and a viewer an generates python code corresponding to the workflow.
     Precondition: The used functions must be compatible with Workflows and register their
@@ -476,30 +1114,35 @@ def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook:
         The viewer where the workflow was set up.
     notebook: bool, optional
         In case code is generated for jupyter notebooks, it looks a bit different.
+    use_napari: bool, optional
+        Add code that shows the results in napari
+    format_code: bool, optional
+        Format the code PEP8 compliant using autopep8
 
     Returns
     -------
     str
         python code
     """
+    import os
+
     imports = ["from skimage.io import imread", "import stackview"]
     code = []
 
-    import dask
-    order = dask.order.order(workflow._tasks)
-
-    roots = order.keys()
+    roots, order = _topological_order(workflow._tasks)
 
     image_variable_names = {}
+    file_exists = {}
 
     def python_conform_variable_name(value):
-        import os
         if isinstance(value, str):
-            print("File", value, "exists:", os.path.exists(value))
-            if os.path.exists(value):
+            # check every string only once if it's a file
+            if value not in file_exists.keys():
+                file_exists[value] = os.path.exists(value)
+            if file_exists[value]:
                 return f"'{value}'"
 
-            if value not in image_variable_names and not os.path.exists(value):
+            if value not in image_variable_names:
                 # Make a short and readable variable name, e.g. turn a layer
                 # "Result of Gaussian blur" into "image1_gb".
                 # don't do this with file names
@@ -553,27 +1196,21 @@ def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook:
                 module = package_path[0]
                 new_import = "import " + module
 
-                # load the module
-                loaded_module = __import__(module)
+                # load the module, or look it up if it was loaded before
+                alias, version = _module_metadata(module)
 
                 # if the module has an alias, use this alias in the code
-                try:
-                    alias = loaded_module.__common_alias__
+                if alias is not None:
                     new_import = new_import + " as " + alias
 
                     if len(package_path) == 1:
                         module = alias
                     else:
                         module = alias + "." + ".".join(package_path[1:])
-                except:
-                    pass
 
                 # document version
-                try:
-                    version = loaded_module.__version__
+                if version is not None:
                     new_import = new_import + " # version " + str(version)
-                except:
-                    pass
 
                 # add imports
                 if new_import not in imports:
@@ -620,8 +1257,7 @@ def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook:
                     pass
 
 
-    build_output(workflow.roots())
-    build_output(roots)
+    build_output(roots + order)
 
     from textwrap import dedent
 
@@ -651,12 +1287,152 @@ def _generate_python_code(workflow: Workflow, viewer: "napari.Viewer", notebook:
 
     complete_code = "\n".join(imports) + "\n" + preamble + "\n\n" + "\n".join(code) + "\n"
 
-    # format the code PEP8
-    import autopep8
-    complete_code = autopep8.fix_code(complete_code)
+    if format_code:
+        # format the code PEP8
+        import autopep8
+        complete_code = autopep8.fix_code(complete_code)
 
     return complete_code
 
+
+@lru_cache(maxsize=None)
+def _module_metadata(module_name: str):
+    """
+    Imports a module and returns its common alias (e.g. `cle` for pyclesperanto_prototype)
+    and its version. Both are None if the module doesn't specify them. The result is
+    cached because importing and probing modules is slow compared to code generation.
+
+    Parameters
+    ----------
+    module_name: str
+
+    Returns
+    -------
+    tuple(str, str)
+        alias and version
+    """
+    loaded_module = __import__(module_name)
+    alias = getattr(loaded_module, "__common_alias__", None)
+    version = getattr(loaded_module, "__version__", None)
+    return alias, version
+
+
+# function -> result of _signature_details; entries are removed together with their functions
+_signatures = weakref.WeakKeyDictionary()
+
+
+def _cached_signature(function):
+    """
+    Returns the signature of a function and, if it only has positional-or-keyword
+    parameters, their names and default values for binding arguments quickly. Functions
+    that cannot be referenced weakly, e.g. some builtins, are not cached.
+    """
+    try:
+        return _signatures[function]
+    except KeyError:
+        pass
+    except TypeError:
+        # not hashable or not weakly referencable
+        return _signature_details(function)
+    details = _signature_details(function)
+    _signatures[function] = details
+    return details
+
+
+def _signature_details(function):
+    signature = inspect.signature(function)
+    names = []
+    defaults = []
+    for parameter in signature.parameters.values():
+        if parameter.kind != inspect.Parameter.POSITIONAL_OR_KEYWORD:
+            return signature, None, None
+        names.append(parameter.name)
+        defaults.append(parameter.default)
+    return signature, tuple(names), tuple(defaults)
+
+
+def _bind_arguments(function, args, kwargs):
+    """
+    Returns the values of all parameters of a function when called with the given
+    arguments, including default values, as `inspect.BoundArguments` would list them.
+    """
+    signature, names, defaults = _cached_signature(function)
+
+    if names is not None and len(args) <= len(names):
+        values = list(args) + [kwargs.get(n, d) for n, d in zip(names[len(args):], defaults[len(args):])]
+        if not any([v is inspect.Parameter.empty for v in values]) and all([k in names[len(args):] for k in kwargs.keys()]):
+            return values
+
+    # the general case, which also raises the same errors as calling the function would
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    return [value for key, value in bound.arguments.items()]
+
+
+def _same_task(task1, task2):
+    """
+    Returns True if two task tuples call the same function with the same parameters.
+    Images are compared by identity.
+    """
+    if len(task1) != len(task2) or task1[0] is not task2[0]:
+        return False
+    for a, b in zip(task1[1:], task2[1:]):
+        if a is b:
+            continue
+        if type(a) is not type(b) or not isinstance(a, (str, int, float, bool)) or a != b:
+            return False
+    return True
+
+
+def _topological_order(tasks):
+    """
+    Sorts the tasks of a workflow so that every task comes after the tasks it depends on.
+
+    Parameters
+    ----------
+    tasks: dict
+        task dictionary as stored in Workflow._tasks
+
+    Returns
+    -------
+    tuple(list[str], list[str])
+        names of the roots, which are not produced by any function, and names of the
+        tasks with functions in the order they can be executed
+    """
+    from collections import deque
+
+    functions = [key for key, task in tasks.items() if _is_task(task)]
+    function_keys = set(functions)
+
+    roots = []
+    known_roots = set()
+    missing = {}
+    followers = {key: [] for key in functions}
+    for key in functions:
+        sources = set()
+        for source in tasks[key]:
+            if isinstance(source, str):
+                if source in function_keys:
+                    sources.add(source)
+                elif source not in known_roots:
+                    known_roots.add(source)
+                    roots.append(source)
+        missing[key] = len(sources)
+        for source in sources:
+            followers[source].append(key)
+
+    order = []
+    ready = deque([key for key in functions if missing[key] == 0])
+    while len(ready) > 0:
+        key = ready.popleft()
+        order.append(key)
+        for follower in followers[key]:
+            missing[follower] = missing[follower] - 1
+            if missing[follower] == 0:
+                ready.append(follower)
+
+    return roots, order
+
 def _viewer_add_image_and_notebook_screenshot(code, viewer, notebook, result_name, key):
     import napari
 
@@ -764,3 +1540,54 @@ def _break_down_4d_to_2d_args(arguments, current_timepoint, viewer):
 
 def is_image(something):
     return hasattr(something, "dtype") and hasattr(something, "shape")
+
+
+def _is_task(task):
+    """
+    Returns if an entry of a task dictionary is a processing step, i.e. a tuple starting with a function.
+    """
+    return isinstance(task, tuple) and len(task) > 0 and callable(task[0])
+
+
+def _wrap_tasks(tasks, wrapper):
+    """
+    Returns a copy of a task dictionary where the function of every task is replaced by
+    `wrapper(name, task)`. Arguments of the tasks stay untouched so that dask still
+    resolves them. Entries that are not tasks, e.g. image data, are copied as they are.
+
+    Parameters
+    ----------
+    tasks: dict
+        task dictionary as stored in Workflow._tasks
+    wrapper: callable
+        receives the name of the task and the task tuple and returns the function to call instead
+
+    Returns
+    -------
+    dict
+    """
+    wrapped = {}
+    for name, task in tasks.items():
+        if _is_task(task):
+            wrapped[name] = tuple([wrapper(name, task)] + list(task[1:]))
+        else:
+            wrapped[name] = task
+    return wrapped
+
+
+def _identity(data):
+    """
+    Returns the given data, e.g. for replacing a task by a known result using
+    `partial(_identity, result)`.
+    """
+    return data
+
+
+def _remove_file(filename):
+    """
+    Removes a file if it exists, e.g. a temporary file that may have been removed already.
+    """
+    try:
+        os.remove(filename)
+    except OSError:
+        pass
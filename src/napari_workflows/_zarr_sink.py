@@ -0,0 +1,202 @@
+import os
+import threading
+from ._workflow import Workflow, is_image, _wrap_tasks
+
+
+class ZarrSink():
+    """
+    Writes results of workflow tasks into chunked, compressed Zarr arrays, one array per
+    task, in a directory. Results are written as soon as they are computed, while other
+    tasks are still running, and the chunks of each result are written in parallel.
+
+    Requires the zarr package.
+
+    Parameters
+    ----------
+    path: str
+        directory containing the arrays
+    chunks: tuple of int, optional
+        chunk shape; by default single 2D planes of at most 1024 x 1024 pixels
+    ome_zarr: bool, optional
+        if True, every task is stored as OME-Zarr image (version 0.4, a single resolution level)
+    num_workers: int, optional
+        number of threads used for computing and writing chunks
+    **array_kwargs
+        passed to zarr when creating arrays, e.g. a different compressor
+    """
+
+    def __init__(self, path: str, chunks=None, ome_zarr: bool = False, num_workers: int = None, **array_kwargs):
+        _import_zarr()
+        self.path = path
+        self.chunks = chunks
+        self.ome_zarr = ome_zarr
+        self.num_workers = num_workers
+        self.array_kwargs = array_kwargs
+        self._lock = threading.Lock()
+
+    def array_path(self, name: str):
+        """
+        Returns the path of the Zarr array storing the result of a given task.
+        """
+        if self.ome_zarr:
+            return os.path.join(self.path, name, "0")
+        return os.path.join(self.path, name)
+
+    def open(self, name: str):
+        """
+        Opens the array storing the result of a given task for reading.
+        """
+        zarr = _import_zarr()
+        return zarr.open_array(store=self.array_path(name), mode="r")
+
+    def write(self, workflow: Workflow, names):
+        """
+        Computes the given tasks and writes their results, replacing previously stored
+        results.
+
+        Parameters
+        ----------
+        workflow: Workflow
+        names: str or list of str
+
+        Returns
+        -------
+        dict
+            task name -> zarr array
+        """
+        return self._compute(workflow, names, append=False)
+
+    def append(self, workflow: Workflow, names):
+        """
+        Computes the given tasks and appends their results as new entry along the first axis
+        of the stored arrays, e.g. after processing another time point or file. Arrays are
+        created on the first call; data stored previously isn't loaded.
+
+        Parameters
+        ----------
+        workflow: Workflow
+        names: str or list of str
+
+        Returns
+        -------
+        dict
+            task name -> index of the appended entry
+        """
+        return self._compute(workflow, names, append=True)
+
+    def _compute(self, workflow, names, append):
+        from dask.threaded import get as dask_get
+
+        if isinstance(names, str):
+            names = [names]
+
+        written = {}
+
+        def writing(name, task):
+            function = task[0]
+            if name not in names:
+                return function
+
+            def run(*args):
+                result = function(*args)
+                if not is_image(result):
+                    raise TypeError("Result of " + name + " is not an image and cannot be written to zarr")
+                written[name] = self._append(name, result) if append else self._write(name, result)
+                return result
+
+            return run
+
+        missing = [n for n in names if n not in workflow._tasks.keys()]
+        if len(missing) > 0:
+            raise KeyError("Tasks not found in workflow: " + ", ".join(missing))
+
+        dask_get(_wrap_tasks(workflow._tasks, writing), list(names), num_workers=self.num_workers)
+        return written
+
+    def _write(self, name, data):
+        zarr = _import_zarr()
+        data = _as_numpy(data)
+        array = zarr.open_array(store=self.array_path(name), mode="w", shape=data.shape,
+                                chunks=self._chunks(data.shape), dtype=data.dtype, **self.array_kwargs)
+        self._store(data, array)
+        if self.ome_zarr:
+            self._write_ome_metadata(name, data.ndim)
+        return array
+
+    def _append(self, name, data):
+        zarr = _import_zarr()
+        data = _as_numpy(data)
+        path = self.array_path(name)
+
+        # reserve the next entry; writing its chunks doesn't need the lock
+        with self._lock:
+            if not os.path.exists(path):
+                array = zarr.open_array(store=path, mode="w", shape=(0,) + data.shape,
+                                        chunks=(1,) + self._chunks(data.shape), dtype=data.dtype, **self.array_kwargs)
+                if self.ome_zarr:
+                    self._write_ome_metadata(name, data.ndim + 1, append=True)
+            else:
+                array = zarr.open_array(store=path, mode="r+")
+                if array.shape[1:] != data.shape:
+                    raise ValueError("Cannot append result of shape " + str(data.shape) + " to " + name +
+                                     " of shape " + str(array.shape))
+            index = array.shape[0]
+            array.resize((index + 1,) + data.shape)
+
+        self._store(data[None], array, (slice(index, index + 1),) + tuple([slice(None)] * data.ndim))
+        return index
+
+    def _store(self, data, array, region=None):
+        import dask.array as da
+        chunks = array.chunks
+        # aligned chunks: every chunk is written by one thread, so no lock is needed
+        da.store(da.from_array(data, chunks=chunks), array, regions=region, lock=False,
+                 scheduler="threads", num_workers=self.num_workers)
+
+    def _chunks(self, shape):
+        if self.chunks is not None:
+            return tuple(self.chunks)
+        return tuple([1] * (len(shape) - 2) + [min(s, 1024) for s in shape[-2:]])
+
+    def _write_ome_metadata(self, name, ndim, append=False):
+        zarr = _import_zarr()
+        group = zarr.open_group(os.path.join(self.path, name), mode="a")
+        group.attrs["multiscales"] = [{
+            "version": "0.4",
+            "name": name,
+            "axes": _ome_axes(ndim, append),
+            "datasets": [{"path": "0", "coordinateTransformations": [{"type": "scale", "scale": [1.0] * ndim}]}],
+        }]
+
+
+def _ome_axes(ndim, append=False):
+    axes = [{"name": "t", "type": "time"}, {"name": "c", "type": "channel"},
+            {"name": "z", "type": "space"}, {"name": "y", "type": "space"}, {"name": "x", "type": "space"}]
+    if ndim > 5:
+        raise ValueError("OME-Zarr supports up to 5 dimensions")
+    if append:
+        # appended entries, e.g. time points, along the first axis
+        return [axes[0]] + axes[5 - (ndim - 1):]
+    if ndim == 4:
+        # time-lapse of volumes
+        return [axes[0]] + axes[2:]
+    return axes[5 - ndim:]
+
+
+def _as_numpy(data):
+    import numpy as np
+    if hasattr(data, "compute"):
+        data = data.compute()
+    if hasattr(data, "get") and not isinstance(data, np.ndarray):
+        # cupy
+        data = data.get()
+    return np.asarray(data)
+
+
+def _import_zarr():
+    try:
+        import zarr
+    except ImportError:
+        raise ImportError("Writing workflow results to zarr requires the zarr package. "
+                          "Install it using `pip install zarr`.")
+    return zarr